@@ -44,7 +44,7 @@ class AdminChannels(commands.Cog):
             if not guild_doc:
                 return False
             
-            servers = guild_doc.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
             for server_config in servers:
                 server_id = server_config.get('server_id', server_config.get('_id', 'default'))
                 if await self.bot.db_manager.is_premium_server(guild_id, server_id):
@@ -125,6 +125,7 @@ class AdminChannels(commands.Cog):
                 },
                 upsert=True
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
             
             # Create success embed
             embed = discord.Embed(
@@ -218,6 +219,7 @@ class AdminChannels(commands.Cog):
                 {"guild_id": guild_id},
                 {"$set": clear_update}
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
             
             # Create confirmation embed
             embed = discord.Embed(
@@ -20,13 +20,13 @@ class ServerAutocomplete:
         Returns:
             List of server documents containing name and ID
         """
-        # Get guild configuration which contains the servers array
-        guild_doc = await database.guilds.find_one({"guild_id": guild_id})
+        # Server configs live in their own collection, keyed by guild
+        servers = []
+        async for server in database.servers.find({"guild_id": guild_id}, projection={"guild_id": 0}):
+            server["_id"] = server.get("server_id", server["_id"])
+            servers.append(server)
         
-        if guild_doc and "servers" in guild_doc:
-            return guild_doc["servers"]
-        
-        return []
+        return servers
     
     @staticmethod
     async def autocomplete_server_name(ctx: discord.AutocompleteContext):
@@ -46,12 +46,10 @@ class ServerAutocomplete:
             
             # Use the database manager to ensure consistent access
             if hasattr(bot, 'db_manager'):
-                # Get guild configuration directly from db_manager
-                guild_config = await bot.db_manager.get_guild(guild_id)
+                # Get guild servers directly from db_manager
+                servers = await bot.db_manager.get_guild_servers(guild_id)
                 
-                if guild_config and "servers" in guild_config:
-                    servers = guild_config["servers"]
-                    
+                if servers:
                     # Return properly formatted server names for the autocomplete with multiple field fallbacks
                     return [
                         discord.OptionChoice(
@@ -32,7 +32,7 @@ class Bounties(commands.Cog):
         if not guild_doc:
             return False
         
-        servers = guild_doc.get('servers', [])
+        servers = await self.bot.db_manager.get_guild_servers(guild_id)
         for server_config in servers:
             server_id = server_config.get('server_id', server_config.get('_id', 'default'))
             if await self.bot.db_manager.is_premium_server(guild_id, server_id):
@@ -447,7 +447,7 @@ class Bounties(commands.Cog):
                 }
             ]
             
-            top_killers = await self.bot.db_manager.kill_events.aggregate(pipeline).to_list(length=None)
+            top_killers = await (await self.bot.db_manager.kill_events.aggregate(pipeline)).to_list(length=None)
             
             for killer_data in top_killers:
                 killer_name = killer_data['_id']
@@ -30,7 +30,7 @@ class Factions(commands.Cog):
         if not guild_doc:
             return False
 
-        servers = guild_doc.get('servers', [])
+        servers = await self.bot.db_manager.get_guild_servers(guild_id)
         for server_config in servers:
             server_id = server_config.get('server_id', 'default')
             if await self.bot.db_manager.is_premium_server(guild_id, server_id):
@@ -5,10 +5,13 @@ Must use non-blocking async-safe logic with user-locks
 """
 
 import asyncio
+import bisect
+import itertools
 import random
 import logging
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Any, Tuple
 
 import discord
 from discord.ext import commands
@@ -16,6 +19,61 @@ from bot.utils.embed_factory import EmbedFactory
 
 logger = logging.getLogger(__name__)
 
+_PREMIUM_REQUIRED_MSG = (
+    "❌ **Premium Feature Required**\n\n"
+    "The Gambling System requires premium access. Contact server administrators for more information."
+)
+
+# Thumbnail attachment shared by every gambling embed
+_THUMB = 'attachment://Gamble.png'
+
+# Roulette table layout
+_ROULETTE_CHOICES = frozenset({
+    'red', 'black', 'odd', 'even', 'low', 'high', '0', '00', *map(str, range(1, 37))
+})
+_SPIN_OPTIONS = ('0', '00', *map(str, range(1, 37)))
+_RED_NUMBERS = frozenset({1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36})
+_BLACK_NUMBERS = frozenset({2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35})
+_PAYOUT_PREDICATES = {
+    'red': _RED_NUMBERS.__contains__,
+    'black': _BLACK_NUMBERS.__contains__,
+    'odd': lambda n: n & 1 == 1,
+    'even': lambda n: n & 1 == 0,
+    'low': lambda n: 1 <= n <= 18,
+    'high': lambda n: 19 <= n <= 36
+}
+
+# Standard 52-card deck as (rank, suit) pairs
+_SUITS = ('♠️', '♥️', '♦️', '♣️')
+_RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+_DECK = tuple((rank, suit) for suit in _SUITS for rank in _RANKS)
+_RANK_VALUE = {
+    'A': 11, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
+    '8': 8, '9': 9, '10': 10, 'J': 10, 'Q': 10, 'K': 10
+}
+
+
+def _card_value(cards) -> int:
+    """Calculate blackjack hand value"""
+    value = sum(_RANK_VALUE[rank] for rank, _ in cards)
+    aces = sum(1 for rank, _ in cards if rank == 'A')
+
+    while value > 21 and aces > 0:
+        value -= 10
+        aces -= 1
+
+    return value
+
+
+def _insufficient_funds(balance: int, bet: int) -> str:
+    """Format the insufficient funds error"""
+    return f"❌ Insufficient funds! You have **${balance:,}** but need **${bet:,}**"
+
+
+def _format_cards(cards) -> List[str]:
+    """Format (rank, suit) cards for embed display"""
+    return [f"{rank}{suit}" for rank, suit in cards]
+
 class Gambling(commands.Cog):
     """
     GAMBLING (PREMIUM)
@@ -24,48 +82,76 @@ class Gambling(commands.Cog):
     - User-locks to prevent concurrent bets
     """
 
+    # Seconds a guild's premium status is cached
+    PREMIUM_CACHE_TTL = 60
+
+    # Seconds the slots "spinning" embed stays up before the result
+    SLOTS_SPIN_SECONDS = 1.5
+
     def __init__(self, bot):
         self.bot = bot
-        self.user_locks: Dict[str, asyncio.Lock] = {}
+        # user_key -> [lock, holders and waiters]; entries go away when the count drops to zero
+        self.user_locks: Dict[str, List[Any]] = {}
         self.active_games: Dict[str, str] = {}
-
-    def get_user_lock(self, user_key: str) -> asyncio.Lock:
-        """Get or create a lock for a user to prevent concurrent bets"""
-        if user_key not in self.user_locks:
-            self.user_locks[user_key] = asyncio.Lock()
-        return self.user_locks[user_key]
+        self._premium_cache: Dict[int, Tuple[float, bool]] = {}
+        self._rng = random.Random()
+
+        # Slot symbols with cumulative weights for bisect sampling
+        self._slot_symbols = ('🍒', '🍋', '🍊', '🍇', '💎', '⭐', '7️⃣')
+        self._slot_cum = list(itertools.accumulate((30, 25, 20, 15, 5, 3, 2)))
+        self._slot_total = self._slot_cum[-1]
+
+    @asynccontextmanager
+    async def user_lock(self, user_key: str):
+        """Hold a user's lock to prevent concurrent bets"""
+        entry = self.user_locks.get(user_key)
+        if entry is None:
+            entry = self.user_locks[user_key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            # Counted from before acquire, so a queued waiter keeps the entry alive
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.user_locks[user_key]
 
     async def check_premium_server(self, guild_id: int) -> bool:
         """Check if guild has premium access for gambling features"""
-        guild_doc = await self.bot.db_manager.get_guild(guild_id)
-        if not guild_doc:
-            return False
+        now = time.monotonic()
+        entry = self._premium_cache.get(guild_id)
+        if entry and now - entry[0] < self.PREMIUM_CACHE_TTL:
+            return entry[1]
 
-        servers = guild_doc.get('servers', [])
-        for server_config in servers:
-            server_id = server_config.get('server_id', 'default')
-            if await self.bot.db_manager.is_premium_server(guild_id, server_id):
-                return True
+        result = await self.bot.db_manager.guild_has_any_premium_server(guild_id)
+        self._premium_cache[guild_id] = (now, result)
+        return result
 
-        return False
+    async def _preflight(self, ctx: discord.ApplicationContext, bet: int,
+                         max_bet: int) -> Optional[Dict[str, Any]]:
+        """Run premium, bet and balance checks shared by every game.
 
-    async def add_wallet_event(self, guild_id: int, discord_id: int, 
-                              amount: int, event_type: str, description: str):
-        """Add wallet transaction event for tracking"""
-        try:
-            event_doc = {
-                "guild_id": guild_id,
-                "discord_id": discord_id,
-                "amount": amount,
-                "event_type": event_type,
-                "description": description,
-                "timestamp": datetime.now(timezone.utc)
-            }
+        Returns the user's wallet, or None after responding with the error.
+        """
+        if not await self.check_premium_server(ctx.guild.id):
+            await ctx.respond(_PREMIUM_REQUIRED_MSG, ephemeral=True)
+            return None
 
-            await self.bot.db_manager.db.wallet_events.insert_one(event_doc)
+        if bet <= 0:
+            await ctx.respond("❌ Bet amount must be positive!", ephemeral=True)
+            return None
 
-        except Exception as e:
-            logger.error(f"Failed to add wallet event: {e}")
+        if bet > max_bet:
+            await ctx.respond(f"❌ Maximum bet is ${max_bet:,}!", ephemeral=True)
+            return None
+
+        wallet = await self.bot.db_manager.get_wallet(ctx.guild.id, ctx.user.id)
+        if wallet['balance'] < bet:
+            await ctx.respond(_insufficient_funds(wallet['balance'], bet), ephemeral=True)
+            return None
+
+        return wallet
 
     @discord.slash_command(name="slots", description="Play animated slot machine")
     async def slots(self, ctx: discord.ApplicationContext, bet: int):
@@ -75,54 +161,40 @@ class Gambling(commands.Cog):
             discord_id = ctx.user.id
             user_key = f"{guild_id}_{discord_id}"
 
-            # Check premium access
-            if not await self.check_premium_server(guild_id):
-                await ctx.respond("❌ **Premium Feature Required**\n\nThe Gambling System requires premium access. Contact server administrators for more information.", ephemeral=True)
-                return
-
-            # Validate bet amount
-            if bet <= 0:
-                await ctx.respond("❌ Bet amount must be positive!", ephemeral=True)
-                return
-
-            if bet > 10000:
-                await ctx.respond("❌ Maximum bet is $10,000!", ephemeral=True)
-                return
-
-            # Use lock to prevent concurrent gambling
-            async with self.get_user_lock(user_key):
-                # Check if user has enough money
-                wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
-                if wallet['balance'] < bet:
-                    await ctx.respond(
-                        f"❌ Insufficient funds! You have **${wallet['balance']:,}** but need **${bet:,}**",
-                        ephemeral=True
-                    )
+            # Lock only the preflight checks and debit so the animation doesn't block the user
+            async with self.user_lock(user_key):
+                wallet = await self._preflight(ctx, bet, 10000)
+                if wallet is None:
                     return
 
                 # Deduct bet amount first
-                await self.bot.db_manager.update_wallet(guild_id, discord_id, -bet, "gambling_slots")
-
-                # Slot symbols and their values
-                symbols = ['🍒', '🍋', '🍊', '🍇', '💎', '⭐', '7️⃣']
-                weights = [30, 25, 20, 15, 5, 3, 2]
+                if not await self.bot.db_manager.update_wallet(guild_id, discord_id, -bet, "gambling_slots"):
+                    await ctx.respond("❌ Failed to process bet. Please try again.", ephemeral=True)
+                    return
 
+            # The bet is already debited; refund it unless the spin settles
+            new_balance = None
+            try:
                 # Show initial spinning state
                 embed, file = await EmbedFactory.build('slots', {
                     'state': 'spinning',
                     'bet_amount': bet,
-                    'thumbnail_url': 'attachment://Gamble.png'
+                    'thumbnail_url': _THUMB
                 })
-                
+            
                 if file:
                     response = await ctx.respond(embed=embed, file=file)
                 else:
                     response = await ctx.respond(embed=embed)
-                
-                await asyncio.sleep(2)
+            
+                # Resolve and settle the spin while the reels animate
+                spin_task = asyncio.create_task(asyncio.sleep(self.SLOTS_SPIN_SECONDS))
 
                 # Generate final results
-                reels = [random.choices(symbols, weights=weights)[0] for _ in range(3)]
+                reels = [
+                    self._slot_symbols[bisect.bisect(self._slot_cum, self._rng.random() * self._slot_total)]
+                    for _ in range(3)
+                ]
 
                 # Calculate winnings
                 winnings = 0
@@ -141,38 +213,45 @@ class Gambling(commands.Cog):
                     else:
                         winnings = bet * 10
                         win = True
-                elif reels[0] == reels[1] or reels[1] == reels[2] or reels[0] == reels[2]:
+                elif len(set(reels)) == 2:  # Any two match
                     winnings = bet * 2
                     win = True
 
-                # Update wallet with winnings (bet was already deducted)
-                if winnings > 0:
-                    await self.bot.db_manager.update_wallet(guild_id, discord_id, winnings, "gambling_slots")
-
-                # Add wallet event
+                # Credit winnings (bet was already deducted) and record the event
                 net_result = winnings - bet
-                await self.add_wallet_event(
-                    guild_id, discord_id, net_result, "gambling_slots",
-                    f"Slots: {' '.join(reels)} | Bet: ${bet:,}"
-                )
+                async with self.user_lock(user_key):
+                    new_balance = await self.bot.db_manager.settle_gamble(
+                        guild_id, discord_id, winnings, "gambling_slots",
+                        f"Slots: {' '.join(reels)} | Bet: ${bet:,}",
+                        event_amount=net_result
+                    )
+            finally:
+                if new_balance is None:
+                    async with self.user_lock(user_key):
+                        refunded = await self.bot.db_manager.update_wallet(
+                            guild_id, discord_id, bet, "gambling_slots_refund"
+                        )
+                    if not refunded:
+                        logger.error(f"Failed to refund slots bet of {bet} for {user_key}")
+
+            if new_balance is None:
+                await ctx.followup.send("❌ Failed to process bet. Please try again.")
+                return
 
-                # Get updated balance
-                updated_wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
+            # Final result display using EmbedFactory
+            embed, _ = await EmbedFactory.build('slots', {
+                'state': 'result',
+                'win': win,
+                'payout': winnings if win else 0,
+                'bet_amount': bet,
+                'new_balance': new_balance,
+                'thumbnail_url': _THUMB
+            })
+            
+            await spin_task
 
-                # Final result display using EmbedFactory
-                embed, file = await EmbedFactory.build('slots', {
-                    'state': 'result',
-                    'win': win,
-                    'payout': winnings if win else 0,
-                    'bet_amount': bet,
-                    'new_balance': updated_wallet['balance'],
-                    'thumbnail_url': 'attachment://Gamble.png'
-                })
-                
-                if file:
-                    await response.edit_original_message(embed=embed, file=file)
-                else:
-                    await response.edit_original_message(embed=embed)
+            # Thumbnail is already attached to the message
+            await response.edit_original_message(embed=embed)
 
         except Exception as e:
             logger.error(f"Failed to process slots: {e}")
@@ -186,38 +265,16 @@ class Gambling(commands.Cog):
             discord_id = ctx.user.id
             user_key = f"{guild_id}_{discord_id}"
 
-            # Check premium access
-            if not await self.check_premium_server(guild_id):
-                await ctx.respond("❌ **Premium Feature Required**\n\nThe Gambling System requires premium access. Contact server administrators for more information.", ephemeral=True)
-                return
-
-            # Validate bet
-            if bet <= 0:
-                await ctx.respond("❌ Bet amount must be positive!", ephemeral=True)
-                return
-
-            if bet > 5000:
-                await ctx.respond("❌ Maximum bet is $5,000!", ephemeral=True)
-                return
-
             # Use lock to prevent concurrent games
-            async with self.get_user_lock(user_key):
-                # Check balance
-                wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
-                if wallet['balance'] < bet:
-                    await ctx.respond(
-                        f"❌ Insufficient funds! You have **${wallet['balance']:,}** but need **${bet:,}**",
-                        ephemeral=True
-                    )
+            async with self.user_lock(user_key):
+                wallet = await self._preflight(ctx, bet, 5000)
+                if wallet is None:
                     return
 
                 await ctx.defer()
 
-                # Create deck
-                suits = ['♠️', '♥️', '♦️', '♣️']
-                ranks = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-                deck = [f"{rank}{suit}" for suit in suits for rank in ranks]
-                random.shuffle(deck)
+                # Shuffled copy of the deck
+                deck = self._rng.sample(_DECK, len(_DECK))
 
                 # Deal initial cards with animation
                 player_cards = []
@@ -231,7 +288,7 @@ class Gambling(commands.Cog):
                     'player_value': 0,
                     'dealer_value': 0,
                     'bet_amount': bet,
-                    'thumbnail_url': 'attachment://Gamble.png'
+                    'thumbnail_url': _THUMB
                 })
                 await ctx.edit_original_response(embed=embed, file=file)
                 await asyncio.sleep(1)
@@ -240,30 +297,9 @@ class Gambling(commands.Cog):
                 player_cards = [deck.pop(), deck.pop()]
                 dealer_cards = [deck.pop(), deck.pop()]
 
-                def card_value(cards):
-                    """Calculate hand value"""
-                    value = 0
-                    aces = 0
-
-                    for card in cards:
-                        rank = card[:-2]
-                        if rank in ['J', 'Q', 'K']:
-                            value += 10
-                        elif rank == 'A':
-                            aces += 1
-                            value += 11
-                        else:
-                            value += int(rank)
-
-                    while value > 21 and aces > 0:
-                        value -= 10
-                        aces -= 1
-
-                    return value
-
-                player_value = card_value(player_cards)
-                dealer_value_hidden = card_value([dealer_cards[0]])  # Only show first card
-                dealer_value = card_value(dealer_cards)
+                player_value = _card_value(player_cards)
+                dealer_value_hidden = _card_value(dealer_cards[:1])  # Only show first card
+                dealer_value = _card_value(dealer_cards)
 
                 # Check for natural blackjack
                 if player_value == 21:
@@ -276,49 +312,45 @@ class Gambling(commands.Cog):
                         net_result = winnings - bet
                 else:
                     # Show initial hands (dealer card hidden)
-                    dealer_display = [dealer_cards[0], '🂠']
+                    dealer_display = [*_format_cards(dealer_cards[:1]), '🂠']
 
-                    embed, file = await EmbedFactory.build('blackjack', {
+                    embed, _ = await EmbedFactory.build('blackjack', {
                         'status': '🎯 **YOUR TURN** 🎯',
-                        'player_cards': player_cards,
+                        'player_cards': _format_cards(player_cards),
                         'dealer_cards': dealer_display,
                         'player_value': player_value,
                         'dealer_value': dealer_value_hidden,
                         'bet_amount': bet,
                         'show_buttons': True,
-                        'thumbnail_url': 'attachment://Gamble.png'
+                        'thumbnail_url': _THUMB
                     })
 
                     # Create action buttons
                     view = BlackjackView(deck, player_cards, dealer_cards, bet, guild_id, discord_id, self.bot)
-                    await ctx.edit_original_response(embed=embed, file=file, view=view)
+                    await ctx.edit_original_response(embed=embed, view=view)
                     return  # Let the view handle the rest
 
                 # Handle immediate resolution (blackjacks)
-                success = await self.bot.db_manager.update_wallet(
-                    guild_id, discord_id, net_result, "gambling_blackjack"
+                new_balance = await self.bot.db_manager.settle_gamble(
+                    guild_id, discord_id, net_result, "gambling_blackjack",
+                    f"Blackjack: P:{player_value} D:{dealer_value} | Bet: ${bet:,}"
                 )
 
-                if success:
-                    await self.add_wallet_event(
-                        guild_id, discord_id, net_result, "gambling_blackjack",
-                        f"Blackjack: P:{player_value} D:{dealer_value} | Bet: ${bet:,}"
-                    )
-
-                    updated_wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
-
-                    embed, file = await EmbedFactory.build('blackjack', {
+                if new_balance is not None:
+                    embed, _ = await EmbedFactory.build('blackjack', {
                         'status': result_text,
-                        'player_cards': player_cards,
-                        'dealer_cards': dealer_cards,
+                        'player_cards': _format_cards(player_cards),
+                        'dealer_cards': _format_cards(dealer_cards),
                         'player_value': player_value,
                         'dealer_value': dealer_value,
                         'bet_amount': bet,
                         'net_result': net_result,
-                        'new_balance': updated_wallet['balance'],
-                        'thumbnail_url': 'attachment://Gamble.png'
+                        'new_balance': new_balance,
+                        'thumbnail_url': _THUMB
                     })
-                    await ctx.edit_original_response(embed=embed, file=file)
+                    await ctx.edit_original_response(embed=embed)
+                else:
+                    await ctx.followup.send("❌ Failed to process bet. Please try again.")
 
         except Exception as e:
             logger.error(f"Failed to process blackjack: {e}")
@@ -332,53 +364,30 @@ class Gambling(commands.Cog):
             discord_id = ctx.user.id
             user_key = f"{guild_id}_{discord_id}"
 
-            # Check premium access
-            if not await self.check_premium_server(guild_id):
-                await ctx.respond("❌ **Premium Feature Required**\n\nThe Gambling System requires premium access. Contact server administrators for more information.", ephemeral=True)
-                return
-
-            # Validate bet
-            if bet <= 0:
-                await ctx.respond("❌ Bet amount must be positive!", ephemeral=True)
-                return
-
-            if bet > 2000:
-                await ctx.respond("❌ Maximum bet is $2,000!", ephemeral=True)
-                return
-
             # Validate choice
-            valid_choices = {
-                'red', 'black', 'odd', 'even', 'low', 'high',
-                '0', '00'
-            }
-
-            for i in range(1, 37):
-                valid_choices.add(str(i))
-
-            if choice.lower() not in valid_choices:
+            if choice.lower() not in _ROULETTE_CHOICES:
                 await ctx.respond(
                     "❌ Invalid choice! Use: red, black, odd, even, low (1-18), high (19-36), or numbers (0-36, 00)",
                     ephemeral=True
                 )
                 return
 
-            # Use lock to prevent concurrent games
-            async with self.get_user_lock(user_key):
-                # Check balance
-                wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
-                if wallet['balance'] < bet:
-                    await ctx.respond(
-                        f"❌ Insufficient funds! You have **${wallet['balance']:,}** but need **${bet:,}**",
-                        ephemeral=True
-                    )
+            # Lock only the preflight checks and debit so the spin doesn't block the user
+            async with self.user_lock(user_key):
+                wallet = await self._preflight(ctx, bet, 2000)
+                if wallet is None:
                     return
 
                 await ctx.defer()
 
-                # Roulette setup
-                red_numbers = {1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36}
-                black_numbers = {2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35}
+                # Deduct bet before the spin
+                if not await self.bot.db_manager.update_wallet(guild_id, discord_id, -bet, "gambling_roulette"):
+                    await ctx.followup.send("❌ Failed to process bet. Please try again.")
+                    return
 
+            # The bet is already debited; refund it unless the game settles
+            new_balance = None
+            try:
                 # Animation frames - ball spinning
                 spinning_frames = [
                     "🎯 Ball spinning... ⚡",
@@ -387,82 +396,81 @@ class Gambling(commands.Cog):
                 ]
 
                 # Show spinning animation
-                for frame in spinning_frames:
-                    embed, file = await EmbedFactory.build('roulette', {
-                        'status': frame,
-                        'player_choice': choice.upper(),
-                        'bet_amount': bet,
-                        'result': '❓',
-                        'thumbnail_url': 'attachment://Gamble.png'
-                    })
-                    await ctx.edit_original_response(embed=embed, file=file)
+                base_payload = {
+                    'player_choice': choice.upper(),
+                    'bet_amount': bet,
+                    'result': '❓',
+                    'thumbnail_url': _THUMB
+                }
+                for i, frame in enumerate(spinning_frames):
+                    embed, file = await EmbedFactory.build('roulette', {**base_payload, 'status': frame})
+                    if i == 0:
+                        await ctx.edit_original_response(embed=embed, file=file)
+                    else:
+                        # Thumbnail is already attached to the message
+                        await ctx.edit_original_response(embed=embed)
                     await asyncio.sleep(1)
 
                 # Final result
-                spin_options = ['0', '00'] + [str(i) for i in range(1, 37)]
-                result = random.choice(spin_options)
+                result = self._rng.choice(_SPIN_OPTIONS)
 
                 # Calculate winnings
                 winnings = 0
                 choice_lower = choice.lower()
 
+                is_green = result in ('0', '00')
+                result_num = 0 if is_green else int(result)
+
                 if choice_lower == result:
                     # Exact number match
                     winnings = bet * 35
-                elif result not in ['0', '00']:
-                    result_num = int(result)
-
-                    if choice_lower == 'red' and result_num in red_numbers:
-                        winnings = bet * 2
-                    elif choice_lower == 'black' and result_num in black_numbers:
-                        winnings = bet * 2
-                    elif choice_lower == 'odd' and result_num % 2 == 1:
-                        winnings = bet * 2
-                    elif choice_lower == 'even' and result_num % 2 == 0:
-                        winnings = bet * 2
-                    elif choice_lower == 'low' and 1 <= result_num <= 18:
-                        winnings = bet * 2
-                    elif choice_lower == 'high' and 19 <= result_num <= 36:
+                elif not is_green:
+                    predicate = _PAYOUT_PREDICATES.get(choice_lower)
+                    if predicate and predicate(result_num):
                         winnings = bet * 2
 
                 net_result = winnings - bet
 
                 # Determine result color
-                if result == '0' or result == '00':
+                if is_green:
                     result_color = '🟢'
-                elif result != '0' and result != '00' and int(result) in red_numbers:
+                elif result_num in _RED_NUMBERS:
                     result_color = '🔴'
                 else:
                     result_color = '⚫'
 
-                # Update wallet
-                success = await self.bot.db_manager.update_wallet(
-                    guild_id, discord_id, net_result, "gambling_roulette"
-                )
-
-                if success:
-                    await self.add_wallet_event(
-                        guild_id, discord_id, net_result, "gambling_roulette",
-                        f"Roulette: {result} | Choice: {choice} | Bet: ${bet:,}"
+                # Credit winnings (bet was already deducted) and record the event
+                async with self.user_lock(user_key):
+                    new_balance = await self.bot.db_manager.settle_gamble(
+                        guild_id, discord_id, winnings, "gambling_roulette",
+                        f"Roulette: {result} | Choice: {choice} | Bet: ${bet:,}",
+                        event_amount=net_result
                     )
-
-                    updated_wallet = await self.bot.db_manager.get_wallet(guild_id, discord_id)
-
-                    status = '🎉 **WINNER!** 🎉' if winnings > 0 else '💸 **HOUSE WINS** 💸'
-
-                    embed, file = await EmbedFactory.build('roulette', {
-                        'status': status,
-                        'player_choice': choice.upper(),
-                        'bet_amount': bet,
-                        'result': f"{result_color} {result}",
-                        'winnings': winnings,
-                        'net_result': net_result,
-                        'new_balance': updated_wallet['balance'],
-                        'thumbnail_url': 'attachment://Gamble.png'
-                    })
-                    await ctx.edit_original_response(embed=embed, file=file)
-                else:
-                    await ctx.followup.send("❌ Failed to process bet. Please try again.")
+            finally:
+                if new_balance is None:
+                    async with self.user_lock(user_key):
+                        refunded = await self.bot.db_manager.update_wallet(
+                            guild_id, discord_id, bet, "gambling_roulette_refund"
+                        )
+                    if not refunded:
+                        logger.error(f"Failed to refund roulette bet of {bet} for {user_key}")
+
+            if new_balance is not None:
+                status = '🎉 **WINNER!** 🎉' if winnings > 0 else '💸 **HOUSE WINS** 💸'
+
+                embed, _ = await EmbedFactory.build('roulette', {
+                    'status': status,
+                    'player_choice': choice.upper(),
+                    'bet_amount': bet,
+                    'result': f"{result_color} {result}",
+                    'winnings': winnings,
+                    'net_result': net_result,
+                    'new_balance': new_balance,
+                    'thumbnail_url': _THUMB
+                })
+                await ctx.edit_original_response(embed=embed)
+            else:
+                await ctx.followup.send("❌ Failed to process bet. Please try again.")
 
         except Exception as e:
             logger.error(f"Failed to process roulette: {e}")
@@ -472,6 +480,12 @@ class Gambling(commands.Cog):
 class BlackjackView(discord.ui.View):
     """Interactive blackjack buttons"""
 
+    # View itself keeps a __dict__; slots cover the per-game state added here
+    __slots__ = (
+        'deck', 'player_cards', 'dealer_cards', 'bet', 'guild_id', 'discord_id', 'bot',
+        'game_over', 'player_value', 'player_aces', 'dealer_value', 'dealer_aces'
+    )
+
     def __init__(self, deck, player_cards, dealer_cards, bet, guild_id, discord_id, bot):
         super().__init__(timeout=60)
         self.deck = deck
@@ -483,26 +497,41 @@ class BlackjackView(discord.ui.View):
         self.bot = bot
         self.game_over = False
 
-    def card_value(self, cards):
-        """Calculate hand value"""
-        value = 0
-        aces = 0
+        # Running hand totals, updated as cards are drawn
+        self.player_value, self.player_aces = self._hand_init(player_cards)
+        self.dealer_value, self.dealer_aces = self._hand_init(dealer_cards)
 
-        for card in cards:
-            rank = card[:-2]
-            if rank in ['J', 'Q', 'K']:
-                value += 10
-            elif rank == 'A':
-                aces += 1
-                value += 11
-            else:
-                value += int(rank)
+    @staticmethod
+    def _add_card(value, aces, card):
+        """Add a card to a (value, soft aces) hand total"""
+        rank, _ = card
+        value += _RANK_VALUE[rank]
+        if rank == 'A':
+            aces += 1
 
         while value > 21 and aces > 0:
             value -= 10
             aces -= 1
 
-        return value
+        return value, aces
+
+    @classmethod
+    def _hand_init(cls, cards):
+        """Calculate (value, soft aces) for a starting hand"""
+        value, aces = 0, 0
+        for card in cards:
+            value, aces = cls._add_card(value, aces, card)
+        return value, aces
+
+    def _draw_player(self):
+        card = self.deck.pop()
+        self.player_cards.append(card)
+        self.player_value, self.player_aces = self._add_card(self.player_value, self.player_aces, card)
+
+    def _draw_dealer(self):
+        card = self.deck.pop()
+        self.dealer_cards.append(card)
+        self.dealer_value, self.dealer_aces = self._add_card(self.dealer_value, self.dealer_aces, card)
 
     @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary, emoji="🃏")
     async def hit_button(self, button: discord.ui.Button, interaction: discord.Interaction):
@@ -510,28 +539,28 @@ class BlackjackView(discord.ui.View):
             return
 
         # Draw card
-        self.player_cards.append(self.deck.pop())
-        player_value = self.card_value(self.player_cards)
+        self._draw_player()
+        player_value = self.player_value
 
         if player_value > 21:
             # Bust
             await self.end_game(interaction, "💥 **BUST!** You went over 21!", -self.bet)
         else:
             # Continue game
-            dealer_display = [self.dealer_cards[0], '🂠']
-            dealer_value_hidden = self.card_value([self.dealer_cards[0]])
+            dealer_display = [*_format_cards(self.dealer_cards[:1]), '🂠']
+            dealer_value_hidden = _card_value(self.dealer_cards[:1])
 
-            embed, file = await EmbedFactory.build('blackjack', {
+            embed, _ = await EmbedFactory.build('blackjack', {
                 'status': '🎯 **YOUR TURN** 🎯',
-                'player_cards': self.player_cards,
+                'player_cards': _format_cards(self.player_cards),
                 'dealer_cards': dealer_display,
                 'player_value': player_value,
                 'dealer_value': dealer_value_hidden,
                 'bet_amount': self.bet,
                 'show_buttons': True,
-                'thumbnail_url': 'attachment://Gamble.png'
+                'thumbnail_url': _THUMB
             })
-            await interaction.response.edit_message(embed=embed, file=file, view=self)
+            await interaction.response.edit_message(embed=embed, view=self)
 
     @discord.ui.button(label="Stand", style=discord.ButtonStyle.secondary, emoji="✋")
     async def stand_button(self, button: discord.ui.Button, interaction: discord.Interaction):
@@ -539,12 +568,11 @@ class BlackjackView(discord.ui.View):
             return
 
         # Dealer plays
-        dealer_value = self.card_value(self.dealer_cards)
-        while dealer_value < 17:
-            self.dealer_cards.append(self.deck.pop())
-            dealer_value = self.card_value(self.dealer_cards)
+        while self.dealer_value < 17:
+            self._draw_dealer()
 
-        player_value = self.card_value(self.player_cards)
+        dealer_value = self.dealer_value
+        player_value = self.player_value
 
         # Determine winner
         if dealer_value > 21:
@@ -560,37 +588,28 @@ class BlackjackView(discord.ui.View):
         """End the blackjack game and update wallet"""
         self.game_over = True
 
-        # Update wallet
-        success = await self.bot.db_manager.update_wallet(
-            self.guild_id, self.discord_id, net_result, "gambling_blackjack"
+        # Update wallet and record the event
+        new_balance = await self.bot.db_manager.settle_gamble(
+            self.guild_id, self.discord_id, net_result, "gambling_blackjack",
+            f"Blackjack: P:{self.player_value} D:{self.dealer_value} | Bet: ${self.bet:,}"
         )
 
-        if success:
-            # Add wallet event
-            gambling_cog = self.bot.get_cog('Gambling')
-            if gambling_cog:
-                await gambling_cog.add_wallet_event(
-                    self.guild_id, self.discord_id, net_result, "gambling_blackjack",
-                    f"Blackjack: P:{self.card_value(self.player_cards)} D:{self.card_value(self.dealer_cards)} | Bet: ${self.bet:,}"
-                )
-
-            updated_wallet = await self.bot.db_manager.get_wallet(self.guild_id, self.discord_id)
-
-            embed, file = await EmbedFactory.build('blackjack', {
+        if new_balance is not None:
+            embed, _ = await EmbedFactory.build('blackjack', {
                 'status': result_text,
-                'player_cards': self.player_cards,
-                'dealer_cards': self.dealer_cards,
-                'player_value': self.card_value(self.player_cards),
-                'dealer_value': self.card_value(self.dealer_cards),
+                'player_cards': _format_cards(self.player_cards),
+                'dealer_cards': _format_cards(self.dealer_cards),
+                'player_value': self.player_value,
+                'dealer_value': self.dealer_value,
                 'bet_amount': self.bet,
                 'net_result': net_result,
-                'new_balance': updated_wallet['balance'],
-                'thumbnail_url': 'attachment://Gamble.png'
+                'new_balance': new_balance,
+                'thumbnail_url': _THUMB
             })
 
             # Remove buttons
             self.clear_items()
-            await interaction.response.edit_message(embed=embed, file=file, view=self)
+            await interaction.response.edit_message(embed=embed, view=self)
         else:
             await interaction.response.edit_message(content="❌ Failed to process bet. Please try again.", embed=None, view=None)
 
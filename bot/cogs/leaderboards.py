@@ -38,7 +38,7 @@ class Leaderboards(commands.Cog):
         if not guild_doc:
             return False
 
-        servers = guild_doc.get('servers', [])
+        servers = await self.bot.db_manager.get_guild_servers(guild_id)
         for server_config in servers:
             server_id = server_config.get('server_id', 'default')
             if await self.bot.db_manager.is_premium_server(guild_id, server_id):
@@ -76,6 +76,7 @@ class Leaderboards(commands.Cog):
                 },
                 upsert=True
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
 
             # Create confirmation embed
             embed = discord.Embed(
@@ -197,8 +198,12 @@ class Leaderboards(commands.Cog):
                 ("factions", "🏛️ Top Factions", "Highest performing factions")
             ]
 
+            # Player leaderboards come back from a single aggregation
+            player_boards = await self.bot.db_manager.get_all_leaderboards(guild_id)
+
             for stat_type, title, description in leaderboards:
-                embed = await self.create_leaderboard_embed(guild_id, stat_type, title, description)
+                embed = await self.create_leaderboard_embed(guild_id, stat_type, title, description,
+                                                            player_boards.get(stat_type))
                 if embed:
                     message = await channel.send(embed=embed)
                     self.leaderboard_messages[guild_id].append(message.id)
@@ -209,6 +214,7 @@ class Leaderboards(commands.Cog):
                 {"guild_id": guild_id},
                 {"$set": {"leaderboard_updated": datetime.now(timezone.utc)}}
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
 
             logger.info(f"Generated leaderboards for guild {guild_id}")
 
@@ -216,7 +222,8 @@ class Leaderboards(commands.Cog):
             logger.error(f"Failed to generate leaderboards for guild {guild_id}: {e}")
 
     async def create_leaderboard_embed(self, guild_id: int, stat_type: str, 
-                                     title: str, description: str) -> Optional[discord.Embed]:
+                                     title: str, description: str,
+                                     top_players: Optional[List[Dict[str, Any]]] = None) -> Optional[discord.Embed]:
         """Create a leaderboard embed for a specific stat type"""
         try:
             if stat_type == "factions":
@@ -226,51 +233,53 @@ class Leaderboards(commands.Cog):
             elif stat_type == "weapons":
                 return await self.create_weapon_leaderboard(guild_id, title, description)
             else:
-                return await self.create_player_leaderboard(guild_id, stat_type, title, description)
+                return await self.create_player_leaderboard(guild_id, stat_type, title, description, top_players)
 
         except Exception as e:
             logger.error(f"Failed to create {stat_type} leaderboard: {e}")
             return None
 
     async def create_player_leaderboard(self, guild_id: int, stat_type: str, 
-                                      title: str, description: str) -> Optional[discord.Embed]:
-        """Create player-based leaderboard"""
+                                      title: str, description: str,
+                                      top_players: Optional[List[Dict[str, Any]]] = None) -> Optional[discord.Embed]:
+        """Create player-based leaderboard, optionally from already fetched top players"""
         try:
-            # Get top players for this stat
-            sort_field = stat_type
-            if stat_type == "kdr":
-                # Only include players with at least 5 kills for KDR
-                pipeline = [
-                    {"$match": {"guild_id": guild_id}},
-                    {"$group": {
-                        "_id": "$player_name",
-                        "kills": {"$sum": "$kills"},
-                        "deaths": {"$sum": "$deaths"}
-                    }},
-                    {"$match": {"kills": {"$gte": 5}}},
-                    {"$addFields": {
-                        "kdr": {"$divide": ["$kills", {"$max": ["$deaths", 1]}]}
-                    }},
-                    {"$sort": {"kdr": -1}},
-                    {"$limit": 10}
-                ]
-                top_players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
-            else:
-                # Regular aggregation for other stats
-                pipeline = [
-                    {"$match": {"guild_id": guild_id}},
-                    {"$group": {
-                        "_id": "$player_name",
-                        "player_name": {"$first": "$player_name"},
-                        "kills": {"$sum": "$kills"},
-                        "deaths": {"$sum": "$deaths"},
-                        "kdr": {"$avg": "$kdr"},
-                        "longest_streak": {"$max": "$longest_streak"}
-                    }},
-                    {"$sort": {sort_field: -1}},
-                    {"$limit": 10}
-                ]
-                top_players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+            if top_players is None:
+                # Get top players for this stat
+                sort_field = stat_type
+                if stat_type == "kdr":
+                    # Only include players with at least 5 kills for KDR
+                    pipeline = [
+                        {"$match": {"guild_id": guild_id}},
+                        {"$group": {
+                            "_id": "$player_name",
+                            "kills": {"$sum": "$kills"},
+                            "deaths": {"$sum": "$deaths"}
+                        }},
+                        {"$match": {"kills": {"$gte": 5}}},
+                        {"$addFields": {
+                            "kdr": {"$divide": ["$kills", {"$max": ["$deaths", 1]}]}
+                        }},
+                        {"$sort": {"kdr": -1}},
+                        {"$limit": 10}
+                    ]
+                    top_players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
+                else:
+                    # Regular aggregation for other stats
+                    pipeline = [
+                        {"$match": {"guild_id": guild_id}},
+                        {"$group": {
+                            "_id": "$player_name",
+                            "player_name": {"$first": "$player_name"},
+                            "kills": {"$sum": "$kills"},
+                            "deaths": {"$sum": "$deaths"},
+                            "kdr": {"$avg": "$kdr"},
+                            "longest_streak": {"$max": "$longest_streak"}
+                        }},
+                        {"$sort": {sort_field: -1}},
+                        {"$limit": 10}
+                    ]
+                    top_players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
 
             if not top_players:
                 return None
@@ -424,7 +433,7 @@ class Leaderboards(commands.Cog):
                 {"$limit": 10}
             ]
 
-            top_hunters = await self.bot.db_manager.bounties.aggregate(pipeline).to_list(length=None)
+            top_hunters = await (await self.bot.db_manager.bounties.aggregate(pipeline)).to_list(length=None)
 
             if not top_hunters:
                 return None
@@ -492,6 +501,7 @@ class Leaderboards(commands.Cog):
                         {"guild_id": guild_id},
                         {"$set": {"leaderboard_enabled": False}}
                     )
+                    self.bot.db_manager.invalidate_guild_cache(guild_id)
                     logger.info(f"Disabled leaderboards for guild {guild_id} - premium expired")
 
             logger.info("Hourly leaderboard updates completed")
@@ -528,8 +538,12 @@ class Leaderboards(commands.Cog):
                 ("factions", "🏛️ Top Factions", "Highest performing factions")
             ]
 
+            # Player leaderboards come back from a single aggregation
+            player_boards = await self.bot.db_manager.get_all_leaderboards(guild_id)
+
             for stat_type, title, description in leaderboard_types:
-                await self.update_single_leaderboard(guild_id, channel, stat_type, title, description)
+                await self.update_single_leaderboard(guild_id, channel, stat_type, title, description,
+                                                     player_boards.get(stat_type))
                 await asyncio.sleep(2)  # Prevent rate limiting
 
             # Update last update time
@@ -537,17 +551,19 @@ class Leaderboards(commands.Cog):
                 {"guild_id": guild_id},
                 {"$set": {"leaderboard_updated": datetime.now(timezone.utc)}}
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
 
             logger.info(f"Updated persistent leaderboards for guild {guild_id}")
 
         except Exception as e:
             logger.error(f"Failed to update persistent leaderboards for guild {guild_id}: {e}")
 
-    async def update_single_leaderboard(self, guild_id: int, channel, stat_type: str, title: str, description: str):
+    async def update_single_leaderboard(self, guild_id: int, channel, stat_type: str, title: str, description: str,
+                                        top_players: Optional[List[Dict[str, Any]]] = None):
         """Update or create a single persistent leaderboard"""
         try:
             # Generate new embed
-            new_embed = await self.create_leaderboard_embed(guild_id, stat_type, title, description)
+            new_embed = await self.create_leaderboard_embed(guild_id, stat_type, title, description, top_players)
             if not new_embed:
                 return
 
@@ -595,7 +611,7 @@ class Leaderboards(commands.Cog):
                 {"$limit": 5}
             ]
 
-            top_weapons = await self.bot.db_manager.kill_events.aggregate(pipeline).to_list(length=None)
+            top_weapons = await (await self.bot.db_manager.kill_events.aggregate(pipeline)).to_list(length=None)
 
             if not top_weapons:
                 return None
@@ -626,7 +642,7 @@ class Leaderboards(commands.Cog):
                     {"$limit": 1}
                 ]
 
-                top_player_result = await self.bot.db_manager.kill_events.aggregate(top_player_pipeline).to_list(length=1)
+                top_player_result = await (await self.bot.db_manager.kill_events.aggregate(top_player_pipeline)).to_list(length=1)
                 top_player = top_player_result[0]['_id'] if top_player_result else "Unknown"
                 player_kills = top_player_result[0]['weapon_kills'] if top_player_result else 0
 
@@ -673,6 +689,7 @@ class Leaderboards(commands.Cog):
                         {"guild_id": guild_id},
                         {"$unset": {"leaderboard_enabled": ""}}
                     )
+                    self.bot.db_manager.invalidate_guild_cache(guild_id)
 
             logger.info("Completed hourly leaderboard update")
 
@@ -38,16 +38,16 @@ class LeaderboardsFixed(commands.Cog):
                 await ctx.followup.send("This command can only be used in a server!", ephemeral=True)
                 return
 
-            # Get guild configuration
-            guild_doc = await self.bot.db_manager.get_guild(guild_id)
-            if not guild_doc or not guild_doc.get('servers'):
+            # Get guild servers
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
+            if not servers:
                 await ctx.followup.send("No servers configured for this guild. Use `/addserver` first!", ephemeral=True)
                 return
 
             # Select server
             if server:
                 selected_server = None
-                for server_config in guild_doc['servers']:
+                for server_config in servers:
                     if server_config.get('name', '').lower() == server.lower() or server_config.get('server_id', '') == server:
                         selected_server = server_config
                         break
@@ -56,7 +56,7 @@ class LeaderboardsFixed(commands.Cog):
                     await ctx.followup.send(f"Server '{server}' not found!", ephemeral=True)
                     return
             else:
-                selected_server = guild_doc['servers'][0]
+                selected_server = servers[0]
 
             server_id = selected_server.get('server_id', selected_server.get('_id', 'default'))
             server_name = selected_server.get('name', f'Server {server_id}')
@@ -179,7 +179,7 @@ class LeaderboardsFixed(commands.Cog):
                     {"$sort": {"kills": -1}},
                     {"$limit": 10}
                 ]
-                players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+                players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
                 title = f"{random.choice(title_pools['kills'])} - {server_name}"
                 description = descriptions['kills']
 
@@ -204,7 +204,7 @@ class LeaderboardsFixed(commands.Cog):
                     {"$sort": {"deaths": -1}},
                     {"$limit": 10}
                 ]
-                players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+                players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
                 title = f"{random.choice(title_pools['deaths'])} - {server_name}"
                 description = descriptions['deaths']
 
@@ -230,7 +230,7 @@ class LeaderboardsFixed(commands.Cog):
                     {"$sort": {"kdr": -1}},
                     {"$limit": 10}
                 ]
-                players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+                players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
                 title = f"{random.choice(title_pools['kdr'])} - {server_name}"
                 description = descriptions['kdr']
 
@@ -256,7 +256,7 @@ class LeaderboardsFixed(commands.Cog):
                     {"$sort": {"total_distance": -1}},
                     {"$limit": 10}
                 ]
-                players = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+                players = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
                 title = f"{random.choice(title_pools['distance'])} - {server_name}"
                 description = descriptions['distance']
 
@@ -277,7 +277,7 @@ class LeaderboardsFixed(commands.Cog):
                     {"$sort": {"kills": -1}},
                     {"$limit": 10}
                 ]
-                weapons_data = await self.bot.db_manager.kill_events.aggregate(pipeline).to_list(length=None)
+                weapons_data = await (await self.bot.db_manager.kill_events.aggregate(pipeline)).to_list(length=None)
 
                 if not weapons_data:
                     return None, None
@@ -334,7 +334,7 @@ class LeaderboardsFixed(commands.Cog):
                         "deaths": {"$sum": "$deaths"}
                     }}
                 ]
-                player_stats = await self.bot.db_manager.pvp_data.aggregate(pipeline).to_list(length=None)
+                player_stats = await (await self.bot.db_manager.pvp_data.aggregate(pipeline)).to_list(length=None)
 
                 # Group by faction
                 faction_stats = {}
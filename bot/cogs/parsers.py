@@ -102,7 +102,7 @@ class Parsers(commands.Cog):
                 return
 
             # Find the server - now using server ID from autocomplete
-            servers = guild_config.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
             server_found = False
             server_name = "Unknown"
             for srv in servers:
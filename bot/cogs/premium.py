@@ -56,18 +56,19 @@ class Premium(commands.Cog):
                     },
                     "$setOnInsert": {
                         "created_at": datetime.now(timezone.utc),
-                        "servers": [],
                         "channels": {}
                     }
                 },
                 upsert=True
             )
+            self.bot.db_manager.invalidate_guild_cache(guild_id)
 
             # Remove home server status from other guilds
             await self.bot.database.guilds.update_many(
                 {"guild_id": {"$ne": guild_id}},
                 {"$unset": {"is_home_server": ""}}
             )
+            self.bot.db_manager.invalidate_guild_cache()
 
             embed = discord.Embed(
                 title="🏠 Home Server Set",
@@ -241,7 +242,7 @@ class Premium(commands.Cog):
                 await ctx.respond("❌ This guild is not configured!", ephemeral=True)
                 return
 
-            servers = guild_config.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
 
             if not servers:
                 embed = discord.Embed(
@@ -360,7 +361,7 @@ class Premium(commands.Cog):
                 guild_config = await self.bot.db_manager.create_guild(guild_id, ctx.guild.name)
 
             # Check if server already exists
-            existing_servers = guild_config.get('servers', [])
+            existing_servers = await self.bot.db_manager.get_guild_servers(guild_id)
             for server in existing_servers:
                 if server.get('_id') == serverid:
                     await ctx.respond(f"❌ Server **{serverid}** is already added!", ephemeral=True)
@@ -427,7 +428,7 @@ class Premium(commands.Cog):
                 await ctx.respond("❌ This guild is not configured!", ephemeral=True)
                 return
                 
-            servers = guild_config.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
             
             if not servers:
                 embed = discord.Embed(
@@ -512,7 +513,7 @@ class Premium(commands.Cog):
                 return
                 
             # Find server in the guild config - handle both old and new formats
-            servers = guild_config.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
             server_found = False
             server_name = "Unknown Server"
             
@@ -614,7 +615,7 @@ class Premium(commands.Cog):
                 return
                 
             # Find server in the guild config
-            servers = guild_config.get('servers', [])
+            servers = await self.bot.db_manager.get_guild_servers(guild_id)
             server_found = False
             server_config = None
             server_name = "Unknown Server"
@@ -4,15 +4,22 @@ Emerald's Killfeed - PvP Stats System (PHASE 6)
 /compare <user> compares two profiles
 """
 
+import asyncio
+import copy
 import logging
+import time
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 
 import discord
 from discord.ext import commands
 
 logger = logging.getLogger(__name__)
 
+# Kill event weapons that are really suicides and never count as a favorite
+SUICIDE_WEAPONS = frozenset({'Menu Suicide', 'Suicide', 'Falling'})
+
 class Stats(commands.Cog):
     """
     PVP STATS (FREE)
@@ -20,13 +27,48 @@ class Stats(commands.Cog):
     - /compare <user> compares two profiles
     """
     
+    # Seconds combined stats are cached, and the cache size at which stale entries are pruned
+    STATS_CACHE_TTL = 30
+    STATS_CACHE_MAX = 2048
+    
+    # Weapons kept in weapon_stats (most used first)
+    WEAPON_STATS_LIMIT = 10
+    
+    # Seconds concurrent stats requests for a guild wait so they share one set of queries
+    STATS_BATCH_DELAY = 0.01
+    
+    # Seconds a stats request waits for its batch before giving up
+    STATS_BATCH_TIMEOUT = 10
+    
     def __init__(self, bot):
         self.bot = bot
+        self._stats_cache: Dict[Tuple[int, Tuple[str, ...]], Tuple[float, Dict[str, Any]]] = {}
+        self._pending_stats: Dict[int, List[Tuple[List[str], asyncio.Future]]] = {}
+        # Running flush tasks, referenced until done so they aren't garbage collected
+        self._stats_batch_tasks: Set[asyncio.Task] = set()
     
-    async def get_player_combined_stats(self, guild_id: int, player_characters: List[str]) -> Dict[str, Any]:
-        """Get combined stats across all servers for a player's characters"""
-        # Initialize with safe defaults
-        combined_stats = {
+    def invalidate_player_stats(self, guild_id: int, player_names: Optional[List[str]] = None):
+        """Drop cached stats for a guild, or only entries covering any of the given characters"""
+        names = set(player_names or ())
+        stale = [
+            key for key in self._stats_cache
+            if key[0] == guild_id and (not names or names.intersection(key[1]))
+        ]
+        for key in stale:
+            del self._stats_cache[key]
+    
+    def _prune_stats_cache(self, now: float):
+        """Drop expired entries so the cache stays bounded"""
+        expired = [key for key, (stored, _) in self._stats_cache.items() if now - stored >= self.STATS_CACHE_TTL]
+        for key in expired:
+            del self._stats_cache[key]
+        if len(self._stats_cache) >= self.STATS_CACHE_MAX:
+            self._stats_cache.clear()
+    
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        """Safe defaults for a player with no recorded activity"""
+        return {
             'kills': 0,
             'deaths': 0,
             'suicides': 0,
@@ -40,135 +82,171 @@ class Stats(commands.Cog):
             'rival': None,
             'nemesis': None
         }
+    
+    async def get_player_combined_stats(self, guild_id: int, player_characters: List[str]) -> Dict[str, Any]:
+        """Get combined stats across all servers for a player's characters"""
+        cache_key = (guild_id, tuple(sorted(player_characters or ())))
+        now = time.monotonic()
+        entry = self._stats_cache.get(cache_key)
+        if entry and now - entry[0] < self.STATS_CACHE_TTL:
+            return copy.deepcopy(entry[1])
+        
+        if not player_characters:
+            logger.warning("No player characters provided for stats calculation")
+            return self._empty_stats()
         
         try:
-            if not player_characters:
-                logger.warning("No player characters provided for stats calculation")
-                return combined_stats
-            
-            # Get stats from all servers
-            for character in player_characters:
-                try:
-                    cursor = self.bot.db_manager.pvp_data.find({
-                        'guild_id': guild_id,
-                        'player_name': character
-                    })
-                    
-                    async for server_stats in cursor:
-                        if not isinstance(server_stats, dict):
-                            logger.warning(f"Invalid server_stats type: {type(server_stats)}")
-                            continue
-                            
-                        combined_stats['kills'] += server_stats.get('kills', 0)
-                        combined_stats['deaths'] += server_stats.get('deaths', 0)
-                        combined_stats['suicides'] += server_stats.get('suicides', 0)
-                        # Track personal best distance (take the maximum across all servers)
-                        if server_stats.get('personal_best_distance', 0.0) > combined_stats['personal_best_distance']:
-                            combined_stats['personal_best_distance'] = server_stats.get('personal_best_distance', 0.0)
-                        combined_stats['servers_played'] += 1
-                        
-                        # Track best streak
-                        if server_stats.get('best_streak', 0) > combined_stats['best_streak']:
-                            combined_stats['best_streak'] = server_stats.get('best_streak', 0)
-                
-                except Exception as char_error:
-                    logger.error(f"Error processing character {character}: {char_error}")
-                    continue
-            
-            # Calculate KDR safely
-            if combined_stats['deaths'] > 0:
-                combined_stats['kdr'] = combined_stats['kills'] / combined_stats['deaths']
-            else:
-                combined_stats['kdr'] = float(combined_stats['kills'])
-            
-            # Get weapon statistics and rivals/nemesis
-            try:
-                await self._calculate_weapon_stats(guild_id, player_characters, combined_stats)
-            except Exception as weapon_error:
-                logger.error(f"Error calculating weapon stats: {weapon_error}")
+            # Join this guild's pending batch; the first request schedules the flush
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            pending = self._pending_stats.setdefault(guild_id, [])
+            if not pending:
+                loop.call_later(self.STATS_BATCH_DELAY, self._start_stats_flush, guild_id)
+            pending.append((player_characters, future))
             
-            try:
-                await self._calculate_rivals_nemesis(guild_id, player_characters, combined_stats)
-            except Exception as rival_error:
-                logger.error(f"Error calculating rivals/nemesis: {rival_error}")
-            
-            return combined_stats
+            combined_stats = await asyncio.wait_for(future, self.STATS_BATCH_TIMEOUT)
             
         except Exception as e:
-            logger.error(f"Failed to get combined stats: {e}")
-            import traceback
-            logger.error(f"Stack trace: {traceback.format_exc()}")
-            return combined_stats
+            logger.exception(f"Failed to get combined stats: {e}")
+            return self._empty_stats()
+        
+        if len(self._stats_cache) >= self.STATS_CACHE_MAX:
+            self._prune_stats_cache(now)
+        self._stats_cache[cache_key] = (now, copy.deepcopy(combined_stats))
+        
+        return combined_stats
     
-    async def _calculate_weapon_stats(self, guild_id: int, player_characters: List[str], 
-                                    combined_stats: Dict[str, Any]):
-        """Calculate weapon statistics from kill events (excludes suicides)"""
-        try:
-            weapon_counts = {}
-            
-            for character in player_characters:
-                cursor = self.bot.db_manager.kill_events.find({
-                    'guild_id': guild_id,
-                    'killer': character,
-                    'is_suicide': False  # Only count actual PvP kills for weapon stats
-                })
-                
-                async for kill_event in cursor:
-                    weapon = kill_event.get('weapon', 'Unknown')
-                    # Skip suicide weapons even if they somehow got through
-                    if weapon not in ['Menu Suicide', 'Suicide', 'Falling']:
-                        weapon_counts[weapon] = weapon_counts.get(weapon, 0) + 1
-            
-            if weapon_counts:
-                combined_stats['favorite_weapon'] = max(weapon_counts.keys(), key=lambda x: weapon_counts[x])
-                combined_stats['weapon_stats'] = weapon_counts
-            
-        except Exception as e:
-            logger.error(f"Failed to calculate weapon stats: {e}")
+    def _start_stats_flush(self, guild_id: int):
+        """Run a guild's pending stats batch as a tracked task"""
+        task = asyncio.create_task(self._flush_stats_batch(guild_id))
+        self._stats_batch_tasks.add(task)
+        task.add_done_callback(self._stats_batch_tasks.discard)
     
-    async def _calculate_rivals_nemesis(self, guild_id: int, player_characters: List[str], 
-                                      combined_stats: Dict[str, Any]):
-        """Calculate rival (most killed) and nemesis (killed by most)"""
+    async def _flush_stats_batch(self, guild_id: int):
+        """Answer every pending stats request for a guild from one pvp_data and one rollup query"""
+        requests = self._pending_stats.pop(guild_id, [])
+        if not requests:
+            return
+        
         try:
-            kills_against = {}
-            deaths_to = {}
-            
-            for character in player_characters:
-                # Count kills against others
-                cursor = self.bot.db_manager.kill_events.find({
-                    'guild_id': guild_id,
-                    'killer': character,
-                    'is_suicide': False
-                })
-                
-                async for kill_event in cursor:
-                    victim = kill_event.get('victim')
-                    if victim and victim not in player_characters:  # Don't count alt kills
-                        kills_against[victim] = kills_against.get(victim, 0) + 1
-                
-                # Count deaths to others
-                cursor = self.bot.db_manager.kill_events.find({
-                    'guild_id': guild_id,
-                    'victim': character,
-                    'is_suicide': False
-                })
-                
-                async for kill_event in cursor:
-                    killer = kill_event.get('killer')
-                    if killer and killer not in player_characters:  # Don't count alt deaths
-                        deaths_to[killer] = deaths_to.get(killer, 0) + 1
-            
-            # Set rival and nemesis
-            if kills_against:
-                combined_stats['rival'] = max(kills_against.keys(), key=lambda x: kills_against[x])
-                combined_stats['rival_kills'] = kills_against[combined_stats['rival']]
-            
-            if deaths_to:
-                combined_stats['nemesis'] = max(deaths_to.keys(), key=lambda x: deaths_to[x])
-                combined_stats['nemesis_deaths'] = deaths_to[combined_stats['nemesis']]
-            
+            db_manager = self.bot.db_manager
+            names = list({name for characters, _ in requests for name in characters})
+            
+            pvp_totals, rollup_rows = await asyncio.gather(
+                self._fetch_pvp_totals(db_manager.pvp_data, guild_id, names),
+                db_manager.get_player_rollups(
+                    guild_id, names,
+                    projection={'_id': 0, 'player_name': 1, 'weapon_counts': 1, 'kills_against': 1, 'deaths_to': 1}
+                ),
+                return_exceptions=True
+            )
+            if isinstance(pvp_totals, Exception):
+                logger.error(f"Error processing characters {names}: {pvp_totals}", exc_info=pvp_totals)
+                pvp_totals = {}
+            if isinstance(rollup_rows, Exception):
+                logger.error(f"Error reading stats rollup: {rollup_rows}", exc_info=rollup_rows)
+                rollup_rows = []
+            
+            rollups_by_player: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rollup_rows:
+                rollups_by_player.setdefault(row['player_name'], []).append(row)
+            
+            combine = self._combine_stats
+            for characters, future in requests:
+                if not future.done():
+                    future.set_result(combine(characters, pvp_totals, rollups_by_player))
+        
         except Exception as e:
-            logger.error(f"Failed to calculate rivals/nemesis: {e}")
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+    
+    async def _fetch_pvp_totals(self, pvp_data, guild_id: int, player_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Sum pvp_data across all servers per character in one server-side pass"""
+        pipeline = [
+            {'$match': {'guild_id': guild_id, 'player_name': {'$in': player_names}}},
+            {'$project': {
+                '_id': 0, 'player_name': 1, 'kills': 1, 'deaths': 1, 'suicides': 1,
+                'best_streak': 1, 'personal_best_distance': 1
+            }},
+            {'$group': {
+                '_id': '$player_name',
+                'kills': {'$sum': '$kills'},
+                'deaths': {'$sum': '$deaths'},
+                'suicides': {'$sum': '$suicides'},
+                'best_streak': {'$max': '$best_streak'},
+                'personal_best_distance': {'$max': '$personal_best_distance'},
+                'servers_played': {'$sum': 1}
+            }}
+        ]
+        
+        totals = {}
+        async for doc in await pvp_data.aggregate(pipeline):
+            totals[doc['_id']] = doc
+        return totals
+    
+    def _combine_stats(self, player_characters: List[str], pvp_totals: Dict[str, Dict[str, Any]],
+                       rollups_by_player: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Build one player's combined stats from the batch's per-character rows"""
+        combined_stats = self._empty_stats()
+        characters = set(player_characters)
+        
+        for name in characters:
+            totals = pvp_totals.get(name)
+            if not totals:
+                continue
+            for field in ('kills', 'deaths', 'suicides', 'servers_played'):
+                combined_stats[field] += totals.get(field) or 0
+            # $max yields null when no server has the field
+            combined_stats['best_streak'] = max(combined_stats['best_streak'], totals.get('best_streak') or 0)
+            combined_stats['personal_best_distance'] = max(
+                combined_stats['personal_best_distance'], totals.get('personal_best_distance') or 0.0
+            )
+        
+        # Calculate KDR safely
+        if combined_stats['deaths'] > 0:
+            combined_stats['kdr'] = combined_stats['kills'] / combined_stats['deaths']
+        else:
+            combined_stats['kdr'] = float(combined_stats['kills'])
+        
+        # No kills or deaths means no weapon or rival data to derive
+        if combined_stats['kills'] == 0 and combined_stats['deaths'] == 0:
+            return combined_stats
+        
+        # Weapon stats and rivals/nemesis come from the pre-aggregated rollup rows
+        rollups = [row for name in characters for row in rollups_by_player.get(name, ())]
+        self._calculate_event_derived(rollups, characters, combined_stats)
+        
+        return combined_stats
+    
+    def _calculate_event_derived(self, rollups: List[Dict[str, Any]], player_characters: Set[str],
+                                 combined_stats: Dict[str, Any]):
+        """Calculate favorite weapon (excluding suicides), rival (most killed) and nemesis (killed by most)"""
+        weapon_counts = Counter()
+        kills_against = Counter()
+        deaths_to = Counter()
+        for rollup in rollups:
+            weapon_counts.update(rollup['weapon_counts'])
+            kills_against.update(rollup['kills_against'])
+            deaths_to.update(rollup['deaths_to'])
+        
+        for weapon in SUICIDE_WEAPONS:
+            del weapon_counts[weapon]
+        
+        # Alt kills/deaths don't count
+        for character in player_characters:
+            del kills_against[character]
+            del deaths_to[character]
+        
+        if weapon_counts:
+            combined_stats['weapon_stats'] = dict(weapon_counts.most_common(self.WEAPON_STATS_LIMIT))
+            combined_stats['favorite_weapon'] = next(iter(combined_stats['weapon_stats']))
+        
+        if kills_against:
+            combined_stats['rival'], combined_stats['rival_kills'] = kills_against.most_common(1)[0]
+        
+        if deaths_to:
+            combined_stats['nemesis'], combined_stats['nemesis_deaths'] = deaths_to.most_common(1)[0]
     
     @discord.slash_command(name="stats", description="View PvP statistics")
     async def stats(self, ctx, user: discord.Member = None):
@@ -209,48 +287,48 @@ class Stats(commands.Cog):
             # Get combined stats
             stats = await self.get_player_combined_stats(guild_id, player_data['linked_characters'])
             
-            # Create manual embed since EmbedFactory might not have 'profile' template
-            embed = discord.Embed(
-                title=f"⚔️ PvP Statistics",
-                description=f"Statistics for **{player_data.get('primary_character', player_data['linked_characters'][0])}**",
-                color=0x00ff00
-            )
-            
-            # Add fields
-            embed.add_field(
-                name="🎯 Combat Stats",
-                value=f"**Kills:** {stats['kills']}\n**Deaths:** {stats['deaths']}\n**KDR:** {stats['kdr']:.2f}",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="💀 Other Stats", 
-                value=f"**Suicides:** {stats['suicides']}\n**Best Streak:** {stats['best_streak']}\n**Current Streak:** {stats['current_streak']}",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="🔫 Weapon Info",
-                value=f"**Favorite Weapon:** {stats.get('favorite_weapon', 'None')}\n**Best Distance:** {stats['personal_best_distance']:.1f}m",
-                inline=False
-            )
+            kills, deaths, kdr = stats['kills'], stats['deaths'], stats['kdr']
+            favorite_weapon, best_distance = stats.get('favorite_weapon', 'None'), stats['personal_best_distance']
+            
+            fields = [
+                {
+                    'name': "🎯 Combat Stats",
+                    'value': f"**Kills:** {kills}\n**Deaths:** {deaths}\n**KDR:** {kdr:.2f}",
+                    'inline': True
+                },
+                {
+                    'name': "💀 Other Stats",
+                    'value': f"**Suicides:** {stats['suicides']}\n**Best Streak:** {stats['best_streak']}\n**Current Streak:** {stats['current_streak']}",
+                    'inline': True
+                },
+                {
+                    'name': "🔫 Weapon Info",
+                    'value': f"**Favorite Weapon:** {favorite_weapon}\n**Best Distance:** {best_distance:.1f}m",
+                    'inline': False
+                }
+            ]
             
             if stats.get('rival'):
-                embed.add_field(
-                    name="⚔️ Rivalries",
-                    value=f"**Rival:** {stats['rival']} ({stats.get('rival_kills', 0)} kills)\n**Nemesis:** {stats.get('nemesis', 'None')} ({stats.get('nemesis_deaths', 0)} deaths)",
-                    inline=False
-                )
+                fields.append({
+                    'name': "⚔️ Rivalries",
+                    'value': f"**Rival:** {stats['rival']} ({stats.get('rival_kills', 0)} kills)\n**Nemesis:** {stats.get('nemesis', 'None')} ({stats.get('nemesis_deaths', 0)} deaths)",
+                    'inline': False
+                })
             
-            embed.set_thumbnail(url=target_user.avatar.url if target_user.avatar else target_user.default_avatar.url)
-            embed.set_footer(text=f"Requested by {ctx.user.display_name}")
+            # Create manual embed since EmbedFactory might not have 'profile' template
+            embed = discord.Embed.from_dict({
+                'title': "⚔️ PvP Statistics",
+                'description': f"Statistics for **{player_data.get('primary_character', player_data['linked_characters'][0])}**",
+                'color': 0x00ff00,
+                'fields': fields,
+                'thumbnail': {'url': (target_user.avatar or target_user.default_avatar).url},
+                'footer': {'text': f"Requested by {ctx.user.display_name}"}
+            })
             
             await ctx.followup.send(embed=embed)
             
         except Exception as e:
-            logger.error(f"Failed to show stats: {e}")
-            import traceback
-            logger.error(f"Stack trace: {traceback.format_exc()}")
+            logger.exception(f"Failed to show stats: {e}")
             if ctx.response.is_done():
                 await ctx.followup.send("❌ Failed to retrieve statistics.", ephemeral=True)
             else:
@@ -269,8 +347,8 @@ class Stats(commands.Cog):
                 return
             
             # Get both players' data
-            player1_data = await self.bot.db_manager.get_linked_player(guild_id, user1.id)
-            player2_data = await self.bot.db_manager.get_linked_player(guild_id, user2.id)
+            players = await self.bot.db_manager.get_linked_players_bulk(guild_id, [user1.id, user2.id])
+            player1_data, player2_data = players.get(user1.id), players.get(user2.id)
             
             if not player1_data or not isinstance(player1_data, dict):
                 await ctx.respond(
@@ -289,60 +367,60 @@ class Stats(commands.Cog):
             await ctx.defer()
             
             # Get stats for both players
-            stats1 = await self.get_player_combined_stats(guild_id, player1_data['linked_characters'])
-            stats2 = await self.get_player_combined_stats(guild_id, player2_data['linked_characters'])
-            
-            # Create comparison embed manually for reliability
-            embed = discord.Embed(
-                title="⚔️ Player Comparison",
-                description=f"{user1.mention} **VS** {user2.mention}",
-                color=0xff6600
+            stats1, stats2 = await asyncio.gather(
+                self.get_player_combined_stats(guild_id, player1_data['linked_characters']),
+                self.get_player_combined_stats(guild_id, player2_data['linked_characters'])
             )
             
-            # Player 1 stats
-            embed.add_field(
-                name=f"🎯 {user1.display_name}",
-                value=f"**Kills:** {stats1['kills']}\n**Deaths:** {stats1['deaths']}\n**KDR:** {stats1['kdr']:.2f}\n**Best Streak:** {stats1['best_streak']}",
-                inline=True
-            )
-            
-            # VS separator
-            embed.add_field(
-                name="⚔️",
-                value="**VS**",
-                inline=True
-            )
-            
-            # Player 2 stats
-            embed.add_field(
-                name=f"🎯 {user2.display_name}",
-                value=f"**Kills:** {stats2['kills']}\n**Deaths:** {stats2['deaths']}\n**KDR:** {stats2['kdr']:.2f}\n**Best Streak:** {stats2['best_streak']}",
-                inline=True
-            )
+            name1, name2 = user1.display_name, user2.display_name
+            k1, d1, kdr1, bs1 = stats1['kills'], stats1['deaths'], stats1['kdr'], stats1['best_streak']
+            k2, d2, kdr2, bs2 = stats2['kills'], stats2['deaths'], stats2['kdr'], stats2['best_streak']
+            weapon1, weapon2 = stats1.get('favorite_weapon', 'None'), stats2.get('favorite_weapon', 'None')
             
             # Determine winners
-            kill_winner = user1.display_name if stats1['kills'] > stats2['kills'] else user2.display_name if stats2['kills'] > stats1['kills'] else "Tie"
-            kdr_winner = user1.display_name if stats1['kdr'] > stats2['kdr'] else user2.display_name if stats2['kdr'] > stats1['kdr'] else "Tie"
-            
-            embed.add_field(
-                name="🏆 Comparison Results",
-                value=f"**Most Kills:** {kill_winner}\n**Better KDR:** {kdr_winner}",
-                inline=False
-            )
-            
-            if stats1.get('favorite_weapon') or stats2.get('favorite_weapon'):
-                embed.add_field(
-                    name="🔫 Favorite Weapons",
-                    value=f"**{user1.display_name}:** {stats1.get('favorite_weapon', 'None')}\n**{user2.display_name}:** {stats2.get('favorite_weapon', 'None')}",
-                    inline=False
-                )
+            kill_winner = name1 if k1 > k2 else name2 if k2 > k1 else "Tie"
+            kdr_winner = name1 if kdr1 > kdr2 else name2 if kdr2 > kdr1 else "Tie"
+            
+            fields = [
+                {
+                    'name': f"🎯 {name1}",
+                    'value': f"**Kills:** {k1}\n**Deaths:** {d1}\n**KDR:** {kdr1:.2f}\n**Best Streak:** {bs1}",
+                    'inline': True
+                },
+                # VS separator
+                {'name': "⚔️", 'value': "**VS**", 'inline': True},
+                {
+                    'name': f"🎯 {name2}",
+                    'value': f"**Kills:** {k2}\n**Deaths:** {d2}\n**KDR:** {kdr2:.2f}\n**Best Streak:** {bs2}",
+                    'inline': True
+                },
+                {
+                    'name': "🏆 Comparison Results",
+                    'value': f"**Most Kills:** {kill_winner}\n**Better KDR:** {kdr_winner}",
+                    'inline': False
+                }
+            ]
+            
+            if weapon1 or weapon2:
+                fields.append({
+                    'name': "🔫 Favorite Weapons",
+                    'value': f"**{name1}:** {weapon1}\n**{name2}:** {weapon2}",
+                    'inline': False
+                })
             
-            embed.set_footer(text=f"Comparison requested by {ctx.user.display_name}")
+            # Create comparison embed manually for reliability
+            embed = discord.Embed.from_dict({
+                'title': "⚔️ Player Comparison",
+                'description': f"{user1.mention} **VS** {user2.mention}",
+                'color': 0xff6600,
+                'fields': fields,
+                'footer': {'text': f"Comparison requested by {ctx.user.display_name}"}
+            })
             
             await ctx.followup.send(embed=embed)
             
         except Exception as e:
-            logger.error(f"Failed to compare stats: {e}")
+            logger.exception(f"Failed to compare stats: {e}")
             await ctx.respond("❌ Failed to compare statistics.", ephemeral=True)
 
 def setup(bot):
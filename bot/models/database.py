@@ -4,13 +4,71 @@ Emerald's Killfeed - Database Models and Architecture
 Implements PHASE 1 data architecture requirements
 """
 
+import asyncio
+import copy
+import time
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import AsyncMongoClient, DeleteOne, IndexModel, ReadPreference, ReturnDocument, UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.read_concern import ReadConcern
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Aggregation expression for kills/deaths ratio (kills alone when there are no deaths)
+_KDR_EXPR = {
+    "$cond": [
+        {"$gt": ["$deaths", 0]},
+        {"$divide": ["$kills", "$deaths"]},
+        {"$toDouble": "$kills"}
+    ]
+}
+
+# Pipeline upsert defaults: only what a write itself reads is filled in; readers treat
+# any other missing pvp_data counter as 0
+_CREATED_AT_EXPR = {"$ifNull": ["$created_at", "$$NOW"]}
+_KDR_INPUT_DEFAULTS = {
+    "kills": {"$ifNull": ["$kills", 0]},
+    "deaths": {"$ifNull": ["$deaths", 0]}
+}
+
+@lru_cache(maxsize=2048)
+def _server_filter(guild_id: int, server_id: str) -> RawBSONDocument:
+    """Pre-encoded {guild_id, server_id} filter, reused instead of re-encoding per query"""
+    return RawBSONDocument(bson.encode({"guild_id": guild_id, "server_id": server_id}))
+
+def _rollup_key(name: Any) -> str:
+    """Encode a weapon/player name for use as a rollup map key"""
+    # Mongo treats '.' as a path separator and forbids a leading '$'
+    key = str(name or 'Unknown').replace('.', '\uff0e')
+    return '\uff04' + key[1:] if key.startswith('$') else key
+
+def _rollup_name(key: str) -> str:
+    """Decode a rollup map key back to the original name"""
+    return key.replace('\uff0e', '.').replace('\uff04', '$')
+
+def _rollup_key_expr(name_expr: Any) -> Dict[str, Any]:
+    """Aggregation equivalent of _rollup_key for an expression"""
+    key = {"$replaceAll": {
+        "input": {"$toString": {"$cond": [{"$in": [name_expr, [None, ""]]}, "Unknown", name_expr]}},
+        "find": ".",
+        "replacement": "\uff0e"
+    }}
+    return {"$let": {
+        "vars": {"key": key},
+        "in": {"$cond": [
+            {"$eq": [{"$substrCP": ["$$key", 0, 1]}, "$"]},
+            {"$concat": ["\uff04", {"$substrCP": ["$$key", 1, {"$strLenCP": "$$key"}]}]},
+            "$$key"
+        ]}
+    }}
+
 class DatabaseManager:
     """
     Database manager implementing PHASE 1 architecture:
@@ -20,54 +78,166 @@ class DatabaseManager:
     - Premium tracked per game server, not user or guild
     """
 
-    def __init__(self, mongo_client: AsyncIOMotorClient):
+    # Wallet event batching: flush at this many events or after this many seconds
+    WALLET_EVENT_BATCH_SIZE = 100
+    WALLET_EVENT_FLUSH_INTERVAL = 1.0
+
+    # pvp_data stats with a (guild_id, server_id, stat) sort index, partial on stat > 0
+    LEADERBOARD_SORT_STATS = frozenset({"kills", "kdr", "longest_streak"})
+
+    # (collection, index name) pairs dropped at startup because a compound index now covers them
+    LEGACY_INDEXES = (
+        ("kill_events", "guild_id_1_server_id_1_killer_1"),
+        ("kill_events", "guild_id_1_server_id_1_victim_1"),
+        ("kill_events", "guild_id_1_killer_1_is_suicide_1"),
+        ("kill_events", "guild_id_1_victim_1_is_suicide_1"),
+        ("kill_events", "guild_id_1_killer_1_is_suicide_1_weapon_1"),
+        ("kill_events", "guild_id_1_victim_1_is_suicide_1_killer_1"),
+        ("premium", "expires_at_1"),
+        ("bounties", "expires_at_1"),
+        ("pvp_data", "guild_id_1_server_id_1_kills_-1"),
+        ("pvp_data", "guild_id_1_server_id_1_kdr_-1"),
+    )
+
+    # Current players document layout; migrate_players upgrades older documents
+    PLAYER_SCHEMA_VERSION = 1
+
+    # migrations entry for the player_stats_rollup rebuild; removed again when a rollup write fails
+    STATS_ROLLUP_MIGRATION = "player_stats_rollup_backfill"
+
+    # Seconds guild configs and per-server premium status are cached, and the
+    # per-cache entry count at which it is cleared
+    GUILD_CACHE_TTL = 60
+    PREMIUM_CACHE_TTL = 30
+    CACHE_MAX_ENTRIES = 8192
+
+    # Kill event batching: flush at this many events or after this many seconds
+    KILL_EVENT_BATCH_SIZE = 50
+    KILL_EVENT_FLUSH_INTERVAL = 0.2
+
+    def __init__(self, mongo_client: AsyncMongoClient):
         self.client = mongo_client
-        self.db: AsyncIOMotorDatabase = mongo_client.emerald_killfeed
+        self.db: AsyncDatabase = mongo_client.emerald_killfeed
+        logger.info(f"MongoDB connection pool size: {mongo_client.options.pool_options.max_pool_size}")
 
         # Collections based on PHASE 1 architecture
         self.guilds = self.db.guilds                    # Guild configurations
+        self.servers = self.db.servers                  # Game servers (per guild)
         self.players = self.db.players                  # Player linking (per guild)
         self.pvp_data = self.db.pvp_data               # PvP stats (per server)
         self.economy = self.db.economy                  # Wallets (per guild)
+        self.wallet_events = self.db.wallet_events      # Wallet transactions (per guild)
         self.factions = self.db.factions               # Factions (per guild)
         self.premium = self.db.premium                  # Premium status (per server)
         self.kill_events = self.db.kill_events         # Kill events (per server)
+        self.player_stats_rollup = self.db.player_stats_rollup  # Kill event rollups (per server)
         self.bounties = self.db.bounties               # Bounties (per guild)
         self.leaderboards = self.db.leaderboards       # Leaderboard configs
+        self.migrations = self.db.migrations           # One-time startup migrations already applied
+
+        # Read-only views for staleness-tolerant reads (leaderboards, recent kills); writes stay on the primary
+        stale_read_options = {
+            "read_preference": ReadPreference.SECONDARY_PREFERRED,
+            "read_concern": ReadConcern("available")
+        }
+        self._pvp_data_stale = self.pvp_data.with_options(**stale_read_options)
+        self._kill_events_stale = self.kill_events.with_options(**stale_read_options)
+
+        # Read-through caches: key -> (monotonic time stored, value)
+        self._guild_cache: Dict[int, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._servers_cache: Dict[int, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._premium_cache: Dict[Tuple[int, str], Tuple[float, bool]] = {}
+        # (cache id, key) -> [lock, loaders holding or waiting]; dropped when the count reaches zero
+        self._cache_locks: Dict[Tuple[int, Any], List[Any]] = {}
+
+        # Buffered wallet_events writer, started on first event
+        self._wallet_event_queue: asyncio.Queue = asyncio.Queue()
+        self._wallet_event_flusher: Optional[asyncio.Task] = None
+
+        # Buffered kill_events writer, started on first event
+        self._kill_event_queue: asyncio.Queue = asyncio.Queue()
+        self._kill_event_flusher: Optional[asyncio.Task] = None
 
     async def initialize_indexes(self):
         """Create database indexes for optimal performance"""
         try:
-            # Guild indexes
-            await self.guilds.create_index("guild_id", unique=True)
+            # Indexes superseded by the ESR-ordered set below; list each collection's
+            # indexes once and only drop the legacy names still present
+            legacy_by_collection: Dict[str, List[str]] = {}
+            for collection, index_name in self.LEGACY_INDEXES:
+                legacy_by_collection.setdefault(collection, []).append(index_name)
+
+            for collection, index_names in legacy_by_collection.items():
+                existing = await self.db[collection].index_information()
+                for index_name in index_names:
+                    if index_name not in existing:
+                        continue
+                    try:
+                        await self.db[collection].drop_index(index_name)
+                    except OperationFailure:
+                        pass  # Dropped concurrently
 
-            # Player indexes (guild-scoped)
-            await self.players.create_index([("guild_id", 1), ("discord_id", 1)], unique=True)
-            await self.players.create_index([("guild_id", 1), ("linked_characters", 1)])
+            # Guild indexes
+            await self.guilds.create_indexes([IndexModel("guild_id", unique=True)])
 
-            # PvP data indexes (server-scoped)
-            await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("player_name", 1)], unique=True)
-            await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("kills", -1)])
-            await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("kdr", -1)])
+            # Server indexes (guild-scoped)
+            await self.servers.create_indexes([
+                IndexModel([("guild_id", 1), ("server_id", 1)], unique=True)
+            ])
 
-            # Kill events indexes (server-scoped)
-            await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("timestamp", -1)])
-            await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("killer", 1)])
-            await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("victim", 1)])
+            # Player indexes (guild-scoped)
+            await self.players.create_indexes([
+                IndexModel([("guild_id", 1), ("discord_id", 1)], unique=True),
+                IndexModel([("guild_id", 1), ("linked_characters", 1)])
+            ])
+
+            # PvP data indexes (server-scoped): equality on guild/server, then the leaderboard sort key
+            await self.pvp_data.create_indexes([
+                IndexModel([("guild_id", 1), ("server_id", 1), ("player_name", 1)], unique=True),
+                # Players with nothing to rank stay out of the leaderboard indexes
+                *[
+                    IndexModel(
+                        [("guild_id", 1), ("server_id", 1), (stat, -1)],
+                        name=f"{stat}_leaderboard",
+                        partialFilterExpression={stat: {"$gt": 0}}
+                    )
+                    for stat in sorted(self.LEADERBOARD_SORT_STATS)
+                ],
+                # Cross-server player lookups used by /stats totals
+                IndexModel([("guild_id", 1), ("player_name", 1)])
+            ])
+
+            # Kill events indexes (server-scoped): equality on guild/server/player, then newest first
+            await self.kill_events.create_indexes([
+                IndexModel([("guild_id", 1), ("server_id", 1), ("timestamp", -1)]),
+                IndexModel([("guild_id", 1), ("server_id", 1), ("killer", 1), ("timestamp", -1)]),
+                IndexModel([("guild_id", 1), ("server_id", 1), ("victim", 1), ("timestamp", -1)])
+            ])
+
+            # Player stats rollup indexes
+            await self.player_stats_rollup.create_indexes([
+                IndexModel([("guild_id", 1), ("server_id", 1), ("player_name", 1)], unique=True),
+                IndexModel([("guild_id", 1), ("player_name", 1)])
+            ])
 
             # Economy indexes (guild-scoped)
-            await self.economy.create_index([("guild_id", 1), ("discord_id", 1)], unique=True)
+            await self.economy.create_indexes([IndexModel([("guild_id", 1), ("discord_id", 1)], unique=True)])
 
             # Faction indexes (guild-scoped)
-            await self.factions.create_index([("guild_id", 1), ("faction_name", 1)], unique=True)
+            await self.factions.create_indexes([IndexModel([("guild_id", 1), ("faction_name", 1)], unique=True)])
 
-            # Premium indexes (server-scoped)
-            await self.premium.create_index([("guild_id", 1), ("_id", 1)], unique=True)
-            await self.premium.create_index("expires_at")
+            # Premium indexes (server-scoped); TTL reaps expired premium documents
+            await self.premium.create_indexes([
+                IndexModel([("guild_id", 1), ("_id", 1)], unique=True),
+                IndexModel("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+            ])
 
-            # Bounty indexes (guild-scoped)
-            await self.bounties.create_index([("guild_id", 1), ("target_player", 1)])
-            await self.bounties.create_index("expires_at")
+            # Bounty indexes (guild-scoped); TTL reaps expired unclaimed bounties, claimed ones are kept for history
+            await self.bounties.create_indexes([
+                IndexModel([("guild_id", 1), ("target_player", 1)]),
+                IndexModel("expires_at", name="expires_at_ttl", expireAfterSeconds=0,
+                           partialFilterExpression={"claimed": False})
+            ])
 
             logger.info("Database indexes created successfully")
 
@@ -77,12 +247,12 @@ class DatabaseManager:
     # GUILD MANAGEMENT
     async def create_guild(self, guild_id: int, guild_name: str) -> Dict[str, Any]:
         """Create guild configuration"""
+        now = datetime.now(timezone.utc)
         guild_doc = {
             "guild_id": guild_id,
             "guild_name": guild_name,
-            "created_at": datetime.now(timezone.utc),
-            "last_updated": datetime.now(timezone.utc),
-            "servers": [],  # List of connected game servers
+            "created_at": now,
+            "last_updated": now,
             "channels": {
                 "killfeed": None,
                 "leaderboard": None,
@@ -95,21 +265,93 @@ class DatabaseManager:
         }
 
         await self.guilds.insert_one(guild_doc)
+        self.invalidate_guild_cache(guild_id)
         logger.info(f"Created guild: {guild_name} ({guild_id})")
         return guild_doc
 
     async def get_guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
         """Get guild configuration"""
-        return await self.guilds.find_one({"guild_id": guild_id})
+        guild_doc = await self._cached(
+            self._guild_cache, guild_id, self.GUILD_CACHE_TTL,
+            lambda: self.guilds.find_one({"guild_id": guild_id})
+        )
+        # Callers may modify the returned document
+        return copy.deepcopy(guild_doc)
+
+    def invalidate_guild_cache(self, guild_id: Optional[int] = None):
+        """Drop a cached guild configuration after it changes (every guild when guild_id is None)"""
+        if guild_id is None:
+            self._guild_cache.clear()
+            self._servers_cache.clear()
+            return
+        self._guild_cache.pop(guild_id, None)
+        self._servers_cache.pop(guild_id, None)
+
+    async def _cached(self, cache: Dict[Any, Tuple[float, Any]], key: Any, ttl: float, loader):
+        """Return a cached value, loading it at most once per key when missing or older than ttl"""
+        entry = cache.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        # Concurrent misses for the same key wait for a single load
+        lock_key = (id(cache), key)
+        lock_entry = self._cache_locks.get(lock_key)
+        if lock_entry is None:
+            lock_entry = self._cache_locks[lock_key] = [asyncio.Lock(), 0]
+        lock_entry[1] += 1
+        try:
+            async with lock_entry[0]:
+                entry = cache.get(key)
+                if entry and time.monotonic() - entry[0] < ttl:
+                    return entry[1]
+
+                value = await loader()
+                if len(cache) >= self.CACHE_MAX_ENTRIES:
+                    cache.clear()
+                cache[key] = (time.monotonic(), value)
+                return value
+        finally:
+            # Counted from before acquire, so a queued waiter keeps the lock alive
+            lock_entry[1] -= 1
+            if lock_entry[1] == 0:
+                del self._cache_locks[lock_key]
+
+    # SERVER MANAGEMENT (Guild-scoped)
+    @staticmethod
+    def _server_from_doc(server_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Restore the server config shape callers expect (_id is the server ID)"""
+        server_doc["_id"] = server_doc["server_id"]
+        return server_doc
+
+    async def get_guild_servers(self, guild_id: int) -> List[Dict[str, Any]]:
+        """Get game servers configured for a guild"""
+        async def load():
+            cursor = self.servers.find(
+                {"guild_id": guild_id},
+                projection={"_id": 0, "guild_id": 0}
+            ).sort("added_at", 1)
+            return [self._server_from_doc(server_doc) async for server_doc in cursor]
+
+        servers = await self._cached(self._servers_cache, guild_id, self.GUILD_CACHE_TTL, load)
+        # Callers may modify the returned documents
+        return copy.deepcopy(servers)
+
+    async def get_all_servers(self) -> List[Dict[str, Any]]:
+        """Get game servers across all guilds, each tagged with its guild_id"""
+        cursor = self.servers.find({}, projection={"_id": 0})
+        return [self._server_from_doc(server_doc) async for server_doc in cursor]
 
     async def add_server_to_guild(self, guild_id: int, server_config: Dict[str, Any]) -> bool:
         """Add game server to guild"""
         try:
-            result = await self.guilds.update_one(
-                {"guild_id": guild_id},
-                {"$addToSet": {"servers": server_config}}
-            )
-            return result.modified_count > 0
+            server_doc = {k: v for k, v in server_config.items() if k != "_id"}
+            server_doc["server_id"] = str(server_config.get("server_id", server_config.get("_id")))
+            server_doc["guild_id"] = guild_id
+            await self.servers.insert_one(server_doc)
+            self.invalidate_guild_cache(guild_id)
+            return True
+        except DuplicateKeyError:
+            return False
         except Exception as e:
             logger.error(f"Failed to add server to guild {guild_id}: {e}")
             return False
@@ -117,24 +359,50 @@ class DatabaseManager:
     async def remove_server_from_guild(self, guild_id: int, server_id: str) -> bool:
         """Remove game server from guild"""
         try:
-            # Try removing by _id first (new format)
-            result = await self.guilds.update_one(
-                {"guild_id": guild_id},
-                {"$pull": {"servers": {"_id": server_id}}}
-            )
-
-            # If no match, try removing by server_id (old format)
-            if result.modified_count == 0:
-                result = await self.guilds.update_one(
-                    {"guild_id": guild_id},
-                    {"$pull": {"servers": {"server_id": server_id}}}
-                )
-
-            return result.modified_count > 0
+            result = await self.servers.delete_one({"guild_id": guild_id, "server_id": str(server_id)})
+            self.invalidate_guild_cache(guild_id)
+            return result.deleted_count > 0
         except Exception as e:
             logger.error(f"Failed to remove server from guild {guild_id}: {e}")
             return False
 
+    async def migrate_guild_servers(self) -> int:
+        """Move server configs embedded in guild documents into the servers collection"""
+        try:
+            moved = 0
+            async for guild_doc in self.guilds.find(
+                {"servers.0": {"$exists": True}},
+                projection={"guild_id": 1, "servers": 1}
+            ):
+                guild_id = guild_doc["guild_id"]
+                ops = []
+                for server_config in guild_doc["servers"]:
+                    server_id = server_config.get("server_id", server_config.get("_id"))
+                    if server_id is None:
+                        continue
+                    server_doc = {k: v for k, v in server_config.items() if k != "_id"}
+                    server_doc["server_id"] = str(server_id)
+                    server_doc["guild_id"] = guild_id
+                    ops.append(UpdateOne(
+                        {"guild_id": guild_id, "server_id": server_doc["server_id"]},
+                        {"$setOnInsert": server_doc},
+                        upsert=True
+                    ))
+
+                if ops:
+                    await self.servers.bulk_write(ops, ordered=False)
+                    moved += len(ops)
+                await self.guilds.update_one({"_id": guild_doc["_id"]}, {"$unset": {"servers": ""}})
+                self.invalidate_guild_cache(guild_id)
+
+            if moved:
+                logger.info(f"Moved {moved} embedded server configs into the servers collection")
+            return moved
+
+        except Exception as e:
+            logger.error(f"Failed to migrate guild servers: {e}")
+            return 0
+
     # PLAYER LINKING (Guild-scoped)
     async def link_player(self, guild_id: int, discord_id: int, character_name: str) -> bool:
         """Link Discord user to character (guild-scoped)"""
@@ -159,7 +427,8 @@ class DatabaseManager:
                     "discord_id": discord_id,
                     "linked_characters": [character_name],
                     "primary_character": character_name,
-                    "linked_at": datetime.now(timezone.utc)
+                    "linked_at": datetime.now(timezone.utc),
+                    "schema_version": self.PLAYER_SCHEMA_VERSION
                 }
                 await self.players.insert_one(player_doc)
 
@@ -171,70 +440,145 @@ class DatabaseManager:
             return False
 
     async def get_linked_player(self, guild_id: int, discord_id: int) -> Optional[Dict[str, Any]]:
-        """Get linked player data"""
+        """Get linked player data (documents are repaired once at startup by migrate_players)"""
+        return await self.players.find_one(
+            {'guild_id': guild_id, 'discord_id': discord_id},
+            projection={'_id': 0, 'linked_characters': 1, 'primary_character': 1, 'linked_at': 1}
+        )
+
+    async def backfill_stats_rollup(self) -> bool:
+        """Rebuild player_stats_rollup rows from stored kill_events unless already in sync"""
+        migration_id = self.STATS_ROLLUP_MIGRATION
         try:
-            player_doc = await self.players.find_one({
-                'guild_id': guild_id,
-                'discord_id': discord_id
-            })
+            if await self.migrations.find_one({"_id": migration_id}, projection={"_id": 1}):
+                return False
 
-            if player_doc:
-                # Ensure we return a proper dict, not a tuple
-                if isinstance(player_doc, dict):
-                    # Validate required fields
-                    if 'linked_characters' not in player_doc or not player_doc['linked_characters']:
-                        logger.error(f"Player doc missing linked_characters: {player_doc}")
-                        # Try to repair by deleting corrupt document
-                        try:
-                            await self.players.delete_one({
-                                'guild_id': guild_id,
-                                'discord_id': discord_id
-                            })
-                            logger.info(f"Deleted corrupt player document for guild {guild_id}, discord {discord_id}")
-                        except Exception as cleanup_error:
-                            logger.error(f"Failed to cleanup corrupt player document: {cleanup_error}")
-                        return None
-                    
-                    if 'primary_character' not in player_doc:
-                        # Set primary_character if missing and update document
-                        primary_char = player_doc['linked_characters'][0]
-                        player_doc['primary_character'] = primary_char
-                        try:
-                            await self.players.update_one(
-                                {'guild_id': guild_id, 'discord_id': discord_id},
-                                {'$set': {'primary_character': primary_char}}
-                            )
-                            logger.info(f"Set missing primary_character for guild {guild_id}, discord {discord_id}")
-                        except Exception as update_error:
-                            logger.error(f"Failed to set primary_character: {update_error}")
-                    
-                    # Ensure linked_at field exists
-                    if 'linked_at' not in player_doc:
-                        player_doc['linked_at'] = datetime.now(timezone.utc)
-                        try:
-                            await self.players.update_one(
-                                {'guild_id': guild_id, 'discord_id': discord_id},
-                                {'$set': {'linked_at': player_doc['linked_at']}}
-                            )
-                        except Exception as update_error:
-                            logger.error(f"Failed to set linked_at: {update_error}")
-                    
-                    return player_doc
-                else:
-                    logger.error(f"Unexpected player_doc type: {type(player_doc)} - value: {player_doc}")
-                    return None
+            def counts_map(field: str) -> Dict[str, Any]:
+                return {"$arrayToObject": {"$map": {
+                    "input": {"$filter": {"input": "$entries", "cond": {"$eq": ["$$this.field", field]}}},
+                    "in": {"k": _rollup_key_expr("$$this.key"), "v": "$$this.n"}
+                }}}
+
+            def total(field: str) -> Dict[str, Any]:
+                return {"$sum": {"$cond": [{"$eq": ["$_id.field", field]}, "$n", 0]}}
+
+            suicide_entries = [{"player": "$victim", "field": "suicides", "key": None}]
+            kill_entries = [
+                {"player": "$killer", "field": "kills", "key": None},
+                {"player": "$killer", "field": "weapon_counts", "key": "$weapon"},
+                {"player": "$killer", "field": "kills_against", "key": "$victim"},
+                {"player": "$victim", "field": "deaths", "key": None},
+                {"player": "$victim", "field": "deaths_to", "key": "$killer"}
+            ]
+
+            # Each event fans out into one entry per rollup counter it feeds, mirroring _update_stats_rollup
+            pipeline = [
+                {"$match": {"victim": {"$nin": [None, ""]}}},
+                {"$project": {
+                    "guild_id": 1, "server_id": 1, "distance": 1,
+                    "entries": {"$cond": [
+                        {"$eq": ["$is_suicide", True]},
+                        suicide_entries,
+                        {"$cond": [{"$in": ["$killer", [None, ""]]}, [], kill_entries]}
+                    ]}
+                }},
+                {"$unwind": "$entries"},
+                {"$group": {
+                    "_id": {
+                        "guild_id": "$guild_id", "server_id": "$server_id", "player_name": "$entries.player",
+                        "field": "$entries.field", "key": "$entries.key"
+                    },
+                    "n": {"$sum": 1},
+                    "distance": {"$max": {"$cond": [
+                        {"$eq": ["$entries.field", "kills"]}, {"$ifNull": ["$distance", 0.0]}, 0.0
+                    ]}}
+                }},
+                {"$group": {
+                    "_id": {
+                        "guild_id": "$_id.guild_id", "server_id": "$_id.server_id",
+                        "player_name": "$_id.player_name"
+                    },
+                    "kills": total("kills"),
+                    "deaths": total("deaths"),
+                    "suicides": total("suicides"),
+                    "personal_best_distance": {"$max": "$distance"},
+                    "entries": {"$push": {"field": "$_id.field", "key": "$_id.key", "n": "$n"}}
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "guild_id": "$_id.guild_id",
+                    "server_id": "$_id.server_id",
+                    "player_name": "$_id.player_name",
+                    "kills": 1, "deaths": 1, "suicides": 1, "personal_best_distance": 1,
+                    "weapon_counts": counts_map("weapon_counts"),
+                    "kills_against": counts_map("kills_against"),
+                    "deaths_to": counts_map("deaths_to")
+                }},
+                # kill_events holds every event a rollup row has seen, so its totals replace the row
+                {"$merge": {
+                    "into": self.player_stats_rollup.name,
+                    "on": ["guild_id", "server_id", "player_name"],
+                    "whenMatched": [{"$replaceWith": {"$mergeObjects": ["$$new", {"_id": "$_id"}]}}],
+                    "whenNotMatched": "insert"
+                }}
+            ]
+
+            await (await self.kill_events.aggregate(pipeline, allowDiskUse=True)).to_list(length=None)
+            await self.migrations.insert_one({"_id": migration_id, "completed_at": datetime.now(timezone.utc)})
+            logger.info("Backfilled player_stats_rollup from kill_events")
+            return True
 
-            return None
+        except Exception as e:
+            logger.error(f"Failed to backfill player stats rollup: {e}")
+            return False
+
+    async def migrate_players(self) -> int:
+        """Repair player documents written before the current schema version"""
+        try:
+            now = datetime.now(timezone.utc)
+            ops = []
+            async for player_doc in self.players.find({"schema_version": {"$ne": self.PLAYER_SCHEMA_VERSION}}):
+                linked_characters = player_doc.get('linked_characters')
+                if not linked_characters:
+                    # Corrupt document with nothing linked
+                    ops.append(DeleteOne({"_id": player_doc["_id"]}))
+                    continue
+
+                repairs = {"schema_version": self.PLAYER_SCHEMA_VERSION}
+                if 'primary_character' not in player_doc:
+                    repairs['primary_character'] = linked_characters[0]
+                if 'linked_at' not in player_doc:
+                    repairs['linked_at'] = now
+                ops.append(UpdateOne({"_id": player_doc["_id"]}, {"$set": repairs}))
+
+            if ops:
+                await self.players.bulk_write(ops, ordered=False)
+                logger.info(f"Migrated {len(ops)} player documents to schema version {self.PLAYER_SCHEMA_VERSION}")
+            return len(ops)
 
         except Exception as e:
-            logger.error(f"Failed to get linked player: {e}")
-            raise  # Re-raise to allow calling code to handle appropriately
+            logger.error(f"Failed to migrate player documents: {e}")
+            return 0
+
+    async def get_linked_players_bulk(self, guild_id: int, discord_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get linked player data for several users in one query, keyed by discord_id"""
+        players = {}
+        async for player_doc in self.players.find({'guild_id': guild_id, 'discord_id': {'$in': discord_ids}}):
+            # Documents without characters count as unlinked (migrate_players removes them at startup)
+            if not player_doc.get('linked_characters'):
+                continue
+            player_doc.setdefault('primary_character', player_doc['linked_characters'][0])
+            players[player_doc['discord_id']] = player_doc
+        return players
 
     # PVP DATA (Server-scoped)
     async def update_pvp_stats(self, guild_id: int, server_id: str, player_name: str, 
                               stats_update: Dict[str, Any]) -> bool:
         """Update PvP statistics for player on specific server"""
         try:
+            # One identity filter for every read/write below; upserts copy it into new documents
+            player_filter = {"guild_id": guild_id, "server_id": server_id, "player_name": player_name}
+
             # Define all possible stat fields that could be incremented
             incrementable_fields = {
                 "kills", "deaths", "suicides", "longest_streak", "current_streak", "total_distance"
@@ -247,50 +591,26 @@ class DatabaseManager:
                 field_value = list(stats_update.values())[0]
 
                 if field_name in incrementable_fields:
-                    # Create safe defaults without any incrementable fields or timestamps
-                    safe_defaults = {
-                        "guild_id": guild_id,
-                        "server_id": server_id,
-                        "player_name": player_name,
-                        "created_at": datetime.now(timezone.utc),
-                        "kdr": 0.0,
-                        "favorite_weapon": None,
-                        "best_streak": 0,
-                        "personal_best_distance": 0.0
+                    # Increment in one pipeline upsert; missing fields fall back to their defaults
+                    new_fields = {
+                        field_name: {"$add": [{"$ifNull": [f"${field_name}", 0]}, field_value]},
+                        "created_at": _CREATED_AT_EXPR,
+                        "last_updated": "$$NOW"
                     }
+                    if field_name in _KDR_INPUT_DEFAULTS:
+                        # KDR also reads the other counter
+                        other = "deaths" if field_name == "kills" else "kills"
+                        new_fields[other] = _KDR_INPUT_DEFAULTS[other]
+                    pipeline = [{"$set": new_fields}]
+                    if field_name in _KDR_INPUT_DEFAULTS:
+                        pipeline.append({"$set": {"kdr": _KDR_EXPR}})
 
-                    # Only add non-incrementable stat defaults
-                    for field in ["kills", "deaths", "suicides", "longest_streak", "current_streak", "total_distance"]:
-                        if field != field_name:  # Don't set default for field we're incrementing
-                            safe_defaults[field] = 0 if field != "total_distance" else 0.0
-
-                    # Single atomic operation without conflicts
-                    result = await self.pvp_data.update_one(
-                        {
-                            "guild_id": guild_id,
-                            "server_id": server_id,
-                            "player_name": player_name
-                        },
-                        {
-                            "$inc": {field_name: field_value},
-                            "$setOnInsert": safe_defaults,
-                            "$currentDate": {"last_updated": True}
-                        },
-                        upsert=True
-                    )
-
-                    # Handle KDR calculation separately if needed
-                    if field_name in ["kills", "deaths"] and result.acknowledged:
-                        await self._update_kdr(guild_id, server_id, player_name)
+                    await self.pvp_data.update_one(player_filter, pipeline, upsert=True)
 
                 else:
                     # Non-incrementable field, use simple set
                     await self.pvp_data.update_one(
-                        {
-                            "guild_id": guild_id,
-                            "server_id": server_id,
-                            "player_name": player_name
-                        },
+                        player_filter,
                         {
                             "$set": stats_update,
                             "$currentDate": {"last_updated": True}
@@ -298,48 +618,20 @@ class DatabaseManager:
                         upsert=True
                     )
             else:
-                # Complex update - get current doc first to avoid conflicts
-                current_doc = await self.pvp_data.find_one({
-                    "guild_id": guild_id,
-                    "server_id": server_id,
-                    "player_name": player_name
-                })
-
-                # Calculate KDR if kills or deaths are being updated
-                if "kills" in stats_update or "deaths" in stats_update:
-                    kills = stats_update.get("kills", current_doc.get("kills", 0) if current_doc else 0)
-                    deaths = stats_update.get("deaths", current_doc.get("deaths", 0) if current_doc else 0)
-                    stats_update["kdr"] = kills / max(deaths, 1) if deaths > 0 else float(kills)
-
-                if not current_doc:
-                    # Create new document
-                    new_doc = {
-                        "guild_id": guild_id,
-                        "server_id": server_id,
-                        "player_name": player_name,
-                        "created_at": datetime.now(timezone.utc),
-                        "last_updated": datetime.now(timezone.utc),
-                        "kills": 0,
-                        "deaths": 0,
-                        "suicides": 0,
-                        "kdr": 0.0,
-                        "total_distance": 0.0,
-                        "favorite_weapon": None,
-                        "longest_streak": 0,
-                        "current_streak": 0,                        **stats_update
-                    }
-                    await self.pvp_data.insert_one(new_doc)
-                else:
-                    # Update existing document
-                    await self.pvp_data.update_one(
-                        {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
-                        {
-                            "$set": {
-                                **stats_update,
-                                "last_updated": datetime.now(timezone.utc)
-                            }
-                        }
-                    )
+                # Complex update - one pipeline upsert sets the given values and recomputes KDR server-side
+                new_fields = {field: {"$literal": value} for field, value in stats_update.items()}
+                recompute_kdr = any(field in stats_update for field in _KDR_INPUT_DEFAULTS)
+                if recompute_kdr:
+                    for field, default in _KDR_INPUT_DEFAULTS.items():
+                        new_fields.setdefault(field, default)
+                new_fields["created_at"] = _CREATED_AT_EXPR
+                new_fields["last_updated"] = "$$NOW"
+
+                pipeline = [{"$set": new_fields}]
+                if recompute_kdr:
+                    pipeline.append({"$set": {"kdr": _KDR_EXPR}})
+
+                await self.pvp_data.update_one(player_filter, pipeline, upsert=True)
 
             logger.debug(f"Successfully updated PvP stats for {player_name} in server {server_id}")
             return True
@@ -348,27 +640,6 @@ class DatabaseManager:
             logger.error(f"Failed to update PvP stats: {e}")
             return False
 
-    async def _update_kdr(self, guild_id: int, server_id: str, player_name: str):
-        """Helper method to update KDR calculation"""
-        try:
-            current_doc = await self.pvp_data.find_one({
-                "guild_id": guild_id,
-                "server_id": server_id,
-                "player_name": player_name
-            })
-
-            if current_doc:
-                kills = current_doc.get("kills", 0)
-                deaths = current_doc.get("deaths", 0)
-                kdr = kills / max(deaths, 1) if deaths > 0 else float(kills)
-
-                await self.pvp_data.update_one(
-                    {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
-                    {"$set": {"kdr": kdr}}
-                )
-        except Exception as e:
-            logger.error(f"Failed to update KDR: {e}")
-
     async def get_pvp_stats(self, guild_id: int, server_id: str, player_name: str) -> Optional[Dict[str, Any]]:
         """Get PvP statistics for player on specific server"""
         return await self.pvp_data.find_one({
@@ -380,29 +651,26 @@ class DatabaseManager:
     async def increment_player_kill(self, guild_id: int, server_id: str, player_name: str, distance: float = 0.0):
         """Increment player kill count, update streak, and handle distance tracking"""
         try:
-            # Get current player stats
-            current_stats = await self.get_pvp_stats(guild_id, server_id, player_name)
-            
-            # Calculate new streak values
-            current_streak = (current_stats.get('current_streak', 0) if current_stats else 0) + 1
-            best_streak = max(current_streak, current_stats.get('best_streak', 0) if current_stats else 0)
-            
-            # Handle distance tracking - only update if this distance is longer
-            distance_update = {}
-            if distance > 0:
-                current_best_distance = current_stats.get('personal_best_distance', 0.0) if current_stats else 0.0
-                if distance > current_best_distance:
-                    distance_update['personal_best_distance'] = distance
-            
-            # Update kills, streaks, and distance in one operation
-            update_data = {
-                'kills': 1,
-                'current_streak': current_streak,
-                'best_streak': best_streak,
-                **distance_update
-            }
-            
-            await self.update_pvp_stats(guild_id, server_id, player_name, update_data)
+            # Kills, streaks, distance and KDR are computed server-side in one atomic upsert
+            await self.pvp_data.update_one(
+                {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
+                [
+                    {"$set": {
+                        "kills": {"$add": [{"$ifNull": ["$kills", 0]}, 1]},
+                        "deaths": {"$ifNull": ["$deaths", 0]},
+                        "suicides": {"$ifNull": ["$suicides", 0]},
+                        "current_streak": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]},
+                        "personal_best_distance": {"$max": [{"$ifNull": ["$personal_best_distance", 0.0]}, distance or 0.0]},
+                        "created_at": {"$ifNull": ["$created_at", "$$NOW"]},
+                        "last_updated": "$$NOW"
+                    }},
+                    {"$set": {
+                        "best_streak": {"$max": [{"$ifNull": ["$best_streak", 0]}, "$current_streak"]},
+                        "kdr": _KDR_EXPR
+                    }}
+                ],
+                upsert=True
+            )
             
         except Exception as e:
             logger.error(f"Failed to increment player kill: {e}")
@@ -410,11 +678,22 @@ class DatabaseManager:
     async def increment_player_death(self, guild_id: int, server_id: str, player_name: str):
         """Increment player death count and reset current streak"""
         try:
-            # Reset current streak to 0 when player dies
-            await self.update_pvp_stats(guild_id, server_id, player_name, {
-                'deaths': 1,
-                'current_streak': 0
-            })
+            # Reset current streak to 0 when player dies; KDR is recomputed in the same upsert
+            await self.pvp_data.update_one(
+                {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
+                [
+                    {"$set": {
+                        "deaths": {"$add": [{"$ifNull": ["$deaths", 0]}, 1]},
+                        "kills": {"$ifNull": ["$kills", 0]},
+                        "suicides": {"$ifNull": ["$suicides", 0]},
+                        "current_streak": 0,
+                        "created_at": {"$ifNull": ["$created_at", "$$NOW"]},
+                        "last_updated": "$$NOW"
+                    }},
+                    {"$set": {"kdr": _KDR_EXPR}}
+                ],
+                upsert=True
+            )
             
         except Exception as e:
             logger.error(f"Failed to increment player death: {e}")
@@ -431,7 +710,7 @@ class DatabaseManager:
 
     # KILL EVENTS (Server-scoped)
     async def add_kill_event(self, guild_id: int, server_id: str, kill_data: Dict[str, Any]) -> bool:
-        """Add kill event to database"""
+        """Queue kill event for a batched insert and fold it into the stats rollup"""
         try:
             kill_event = {
                 "guild_id": guild_id,
@@ -440,17 +719,179 @@ class DatabaseManager:
                 **kill_data
             }
 
-            await self.kill_events.insert_one(kill_event)
+            self._kill_event_queue.put_nowait(kill_event)
+            if self._kill_event_flusher is None or self._kill_event_flusher.done():
+                self._kill_event_flusher = asyncio.create_task(self._run_batch_writer(
+                    self._kill_event_queue, self.kill_events,
+                    self.KILL_EVENT_BATCH_SIZE, self.KILL_EVENT_FLUSH_INTERVAL, "kill events"
+                ))
+
+            try:
+                await self._update_stats_rollup(guild_id, server_id, kill_data)
+            except Exception as e:
+                # The event is still stored, so rebuild the rollup from kill_events on next startup
+                logger.error(f"Failed to update stats rollup, scheduling a rebuild: {e}")
+                await self._schedule_stats_rollup_rebuild()
             return True
 
         except Exception as e:
             logger.error(f"Failed to add kill event: {e}")
             return False
 
+    async def _schedule_stats_rollup_rebuild(self):
+        """Make the next backfill_stats_rollup run rebuild the rollup from kill_events"""
+        try:
+            await self.migrations.delete_one({"_id": self.STATS_ROLLUP_MIGRATION})
+        except Exception as e:
+            logger.error(f"Failed to schedule stats rollup rebuild: {e}")
+
+    async def _update_stats_rollup(self, guild_id: int, server_id: str, kill_data: Dict[str, Any]):
+        """Fold a kill event into the killer's and victim's player_stats_rollup rows"""
+        killer = kill_data.get('killer')
+        victim = kill_data.get('victim')
+
+        if kill_data.get('is_suicide'):
+            if victim:
+                await self.player_stats_rollup.update_one(
+                    {"guild_id": guild_id, "server_id": server_id, "player_name": victim},
+                    {"$inc": {"suicides": 1}},
+                    upsert=True
+                )
+            return
+
+        if not killer or not victim:
+            return
+
+        await asyncio.gather(
+            self.player_stats_rollup.update_one(
+                {"guild_id": guild_id, "server_id": server_id, "player_name": killer},
+                {
+                    "$inc": {
+                        "kills": 1,
+                        f"weapon_counts.{_rollup_key(kill_data.get('weapon'))}": 1,
+                        f"kills_against.{_rollup_key(victim)}": 1
+                    },
+                    "$max": {"personal_best_distance": kill_data.get('distance') or 0.0}
+                },
+                upsert=True
+            ),
+            self.player_stats_rollup.update_one(
+                {"guild_id": guild_id, "server_id": server_id, "player_name": victim},
+                {"$inc": {"deaths": 1, f"deaths_to.{_rollup_key(killer)}": 1}},
+                upsert=True
+            )
+        )
+
+    async def bulk_apply_events(self, guild_id: int, server_id: str, events: List[Dict[str, Any]]) -> bool:
+        """Insert a batch of replayed kill events and apply their stats with one bulk write per collection"""
+        if not events:
+            return True
+
+        try:
+            now = datetime.now(timezone.utc)
+            kill_docs = []
+            pvp_counts: Dict[str, Counter] = {}
+            rollup_counts: Dict[str, Counter] = {}
+            best_distance: Dict[str, float] = {}
+
+            for kill_data in events:
+                kill_docs.append({"guild_id": guild_id, "server_id": server_id, "timestamp": now, **kill_data})
+
+                killer = kill_data.get('killer')
+                victim = kill_data.get('victim')
+                if not killer or not victim:
+                    continue
+
+                if kill_data.get('is_suicide'):
+                    pvp_counts.setdefault(victim, Counter())['suicides'] += 1
+                    rollup_counts.setdefault(victim, Counter())['suicides'] += 1
+                    continue
+
+                pvp_counts.setdefault(killer, Counter())['kills'] += 1
+                pvp_counts.setdefault(victim, Counter())['deaths'] += 1
+
+                killer_counts = rollup_counts.setdefault(killer, Counter())
+                killer_counts['kills'] += 1
+                killer_counts[f"weapon_counts.{_rollup_key(kill_data.get('weapon'))}"] += 1
+                killer_counts[f"kills_against.{_rollup_key(victim)}"] += 1
+                victim_counts = rollup_counts.setdefault(victim, Counter())
+                victim_counts['deaths'] += 1
+                victim_counts[f"deaths_to.{_rollup_key(killer)}"] += 1
+
+                best_distance[killer] = max(best_distance.get(killer, 0.0), kill_data.get('distance') or 0.0)
+
+            # Increments commute, so one unordered op per player gives the same totals in any order
+            pvp_ops = [
+                UpdateOne(
+                    {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
+                    [
+                        {"$set": {
+                            **{
+                                field: {"$add": [{"$ifNull": [f"${field}", 0]}, counts[field]]}
+                                for field in ("kills", "deaths", "suicides")
+                            },
+                            "personal_best_distance": {"$max": [
+                                {"$ifNull": ["$personal_best_distance", 0.0]}, best_distance.get(player_name, 0.0)
+                            ]},
+                            "created_at": {"$ifNull": ["$created_at", "$$NOW"]},
+                            "last_updated": "$$NOW"
+                        }},
+                        {"$set": {"kdr": _KDR_EXPR}}
+                    ],
+                    upsert=True
+                )
+                for player_name, counts in pvp_counts.items()
+            ]
+
+            rollup_ops = []
+            for player_name, counts in rollup_counts.items():
+                update = {"$inc": dict(counts)}
+                if player_name in best_distance:
+                    update["$max"] = {"personal_best_distance": best_distance[player_name]}
+                rollup_ops.append(UpdateOne(
+                    {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
+                    update,
+                    upsert=True
+                ))
+
+            writes = [self.kill_events.insert_many(kill_docs, ordered=False)]
+            if pvp_ops:
+                writes.append(self.pvp_data.bulk_write(pvp_ops, ordered=False))
+            if rollup_ops:
+                writes.append(self.player_stats_rollup.bulk_write(rollup_ops, ordered=False))
+            results = await asyncio.gather(*writes, return_exceptions=True)
+
+            if rollup_ops and isinstance(results[-1], Exception):
+                logger.error(f"Failed to update stats rollup, scheduling a rebuild: {results[-1]}")
+                await self._schedule_stats_rollup_rebuild()
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to apply {len(events)} kill events: {e}")
+            return False
+
+    async def get_player_rollups(self, guild_id: int, player_names: List[str],
+                                 projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Get every per-server rollup row for the given characters with decoded map keys"""
+        cursor = self.player_stats_rollup.find(
+            {"guild_id": guild_id, "player_name": {"$in": player_names}},
+            projection
+        ).batch_size(1000)
+
+        rollups = []
+        async for doc in cursor:
+            for field in ('weapon_counts', 'kills_against', 'deaths_to'):
+                doc[field] = {_rollup_name(k): v for k, v in (doc.get(field) or {}).items()}
+            rollups.append(doc)
+        return rollups
+
     async def get_recent_kills(self, guild_id: int, server_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent kill events for server"""
-        cursor = self.kill_events.find(
-            {"guild_id": guild_id, "server_id": server_id}
+        cursor = self._kill_events_stale.find(
+            _server_filter(guild_id, server_id)
         ).sort("timestamp", -1).limit(limit)
 
         return await cursor.to_list(length=limit)
@@ -458,39 +899,40 @@ class DatabaseManager:
     # ECONOMY (Guild-scoped)
     async def get_wallet(self, guild_id: int, discord_id: int) -> Dict[str, Any]:
         """Get user wallet (guild-scoped)"""
-        wallet = await self.economy.find_one({"guild_id": guild_id, "discord_id": discord_id})
-
-        if not wallet:
-            wallet = {
-                "guild_id": guild_id,
-                "discord_id": discord_id,
+        # Create the wallet on first access in the same round trip
+        return await self.economy.find_one_and_update(
+            {"guild_id": guild_id, "discord_id": discord_id},
+            {"$setOnInsert": {
                 "balance": 0,
                 "total_earned": 0,
                 "total_spent": 0,
                 "created_at": datetime.now(timezone.utc)
-            }
-            await self.economy.insert_one(wallet)
-
-        return wallet
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _wallet_update(amount: int) -> Dict[str, Any]:
+        """Update document applying a balance change and its earned/spent totals"""
+        inc_updates = {"balance": amount}
+        if amount > 0:
+            inc_updates["total_earned"] = amount
+        else:
+            inc_updates["total_spent"] = abs(amount)
+
+        return {
+            "$inc": inc_updates,
+            "$currentDate": {"last_updated": True}
+        }
 
     async def update_wallet(self, guild_id: int, discord_id: int, amount: int, 
                            transaction_type: str) -> bool:
         """Update user wallet balance"""
         try:
-            inc_updates = {"balance": amount}
-            if amount > 0:
-                inc_updates["total_earned"] = amount
-            else:
-                inc_updates["total_spent"] = abs(amount)
-
-            update_query = {
-                "$inc": inc_updates,
-                "$set": {"last_updated": datetime.now(timezone.utc)}
-            }
-
             result = await self.economy.update_one(
                 {"guild_id": guild_id, "discord_id": discord_id},
-                update_query,
+                self._wallet_update(amount),
                 upsert=True
             )
 
@@ -500,6 +942,106 @@ class DatabaseManager:
             logger.error(f"Failed to update wallet: {e}")
             return False
 
+    async def adjust_wallet(self, guild_id: int, discord_id: int, amount: int,
+                            transaction_type: str) -> Optional[int]:
+        """Update user wallet balance and return the balance after the update, or None on failure"""
+        try:
+            wallet = await self.economy.find_one_and_update(
+                {"guild_id": guild_id, "discord_id": discord_id},
+                self._wallet_update(amount),
+                projection={"_id": 0, "balance": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+
+            return wallet["balance"]
+
+        except Exception as e:
+            logger.error(f"Failed to update wallet: {e}")
+            return None
+
+    def add_wallet_event(self, guild_id: int, discord_id: int, amount: int,
+                         event_type: str, description: str):
+        """Queue a wallet transaction event; events are inserted in batches"""
+        self._wallet_event_queue.put_nowait({
+            "guild_id": guild_id,
+            "discord_id": discord_id,
+            "amount": amount,
+            "event_type": event_type,
+            "description": description,
+            "timestamp": datetime.now(timezone.utc)
+        })
+
+        if self._wallet_event_flusher is None or self._wallet_event_flusher.done():
+            self._wallet_event_flusher = asyncio.create_task(self._run_batch_writer(
+                self._wallet_event_queue, self.wallet_events,
+                self.WALLET_EVENT_BATCH_SIZE, self.WALLET_EVENT_FLUSH_INTERVAL, "wallet events"
+            ))
+
+    async def _run_batch_writer(self, queue: asyncio.Queue, collection, batch_size: int,
+                                flush_interval: float, label: str):
+        """Background task draining an event queue into a collection with insert_many"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            event_doc = await queue.get()
+            if event_doc is None:
+                return
+
+            batch = [event_doc]
+            stop = False
+            deadline = loop.time() + flush_interval
+            while len(batch) < batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event_doc = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if event_doc is None:
+                    stop = True
+                    break
+                batch.append(event_doc)
+
+            try:
+                await collection.insert_many(batch, ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to add {len(batch)} {label}: {e}")
+
+            if stop:
+                return
+
+    async def flush_wallet_events(self):
+        """Write any queued wallet events and stop the background writer"""
+        if self._wallet_event_flusher and not self._wallet_event_flusher.done():
+            self._wallet_event_queue.put_nowait(None)
+            await self._wallet_event_flusher
+
+    async def flush_kill_events(self):
+        """Write any queued kill events and stop the background writer"""
+        if self._kill_event_flusher and not self._kill_event_flusher.done():
+            self._kill_event_queue.put_nowait(None)
+            await self._kill_event_flusher
+
+    async def settle_gamble(self, guild_id: int, discord_id: int, delta: int, event_type: str,
+                            description: str, event_amount: Optional[int] = None) -> Optional[int]:
+        """Apply a gambling result to the wallet and queue its wallet event.
+
+        Returns the wallet balance after the update, or None when the write fails.
+        The event is only queued once the wallet write succeeds, and records
+        ``event_amount`` when given, otherwise ``delta``.
+        """
+        new_balance = await self.adjust_wallet(guild_id, discord_id, delta, event_type)
+        if new_balance is None:
+            return None
+
+        self.add_wallet_event(
+            guild_id, discord_id, delta if event_amount is None else event_amount,
+            event_type, description
+        )
+        return new_balance
+
     # PREMIUM (Server-scoped)
     async def set_premium_status(self, guild_id: int, server_id: str, 
                                 expires_at: Optional[datetime] = None) -> bool:
@@ -513,15 +1055,15 @@ class DatabaseManager:
                 "guild_id": guild_id,
                 "server_id": server_id,
                 "active": expires_at is not None,
-                "expires_at": expires_at,
-                "updated_at": datetime.now(timezone.utc)
+                "expires_at": expires_at
             }
 
             await self.premium.update_one(
-                {"guild_id": guild_id, "server_id": server_id},
-                {"$set": premium_doc},
+                _server_filter(guild_id, server_id),
+                {"$set": premium_doc, "$currentDate": {"updated_at": True}},
                 upsert=True
             )
+            self._premium_cache.pop((guild_id, server_id), None)
 
             return True
 
@@ -531,25 +1073,38 @@ class DatabaseManager:
 
     async def is_premium_server(self, guild_id: int, server_id: str) -> bool:
         """Check if server has active premium"""
-        premium_doc = await self.premium.find_one({"guild_id": guild_id, "server_id": server_id})
-
-        if not premium_doc or not premium_doc.get("active"):
-            return False
-
-        expires_at = premium_doc.get("expires_at")
-        if expires_at:
-            # Ensure both datetimes are timezone-aware for comparison
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-
-            current_time = datetime.now(timezone.utc)
-
-            if expires_at < current_time:
-                # Premium expired, update status
-                await self.set_premium_status(guild_id, server_id, None)
-                return False
-
-        return True
+        return await self._cached(
+            self._premium_cache, (guild_id, server_id), self.PREMIUM_CACHE_TTL,
+            lambda: self._load_premium_status(guild_id, server_id)
+        )
+
+    async def _load_premium_status(self, guild_id: int, server_id: str) -> bool:
+        """Read a server's premium status from the database"""
+        premium_doc = await self.premium.find_one(
+            {"guild_id": guild_id, "server_id": server_id, **self._active_premium_filter()},
+            projection={"_id": 1}
+        )
+        return premium_doc is not None
+
+    async def guild_has_any_premium_server(self, guild_id: int) -> bool:
+        """Check if any server in the guild has active, unexpired premium"""
+        premium_doc = await self.premium.find_one(
+            {"guild_id": guild_id, **self._active_premium_filter()},
+            projection={"_id": 1}
+        )
+        return premium_doc is not None
+
+    @staticmethod
+    def _active_premium_filter() -> Dict[str, Any]:
+        """Premium that is active and either permanent (no expiry) or not yet expired"""
+        # Expired documents are removed by the TTL index; the $gt covers the reaper's delay
+        return {
+            "active": True,
+            "$or": [
+                {"expires_at": None},
+                {"expires_at": {"$gt": datetime.now(timezone.utc)}}
+            ]
+        }
 
     # LEADERBOARDS
     async def get_leaderboard(self, guild_id: int, server_id: str, stat: str = "kills", 
@@ -557,8 +1112,53 @@ class DatabaseManager:
         """Get leaderboard for specific stat"""
         sort_order = -1 if stat in ["kills", "kdr", "longest_streak"] else 1
 
-        cursor = self.pvp_data.find(
-            {"guild_id": guild_id, "server_id": server_id}
-        ).sort(stat, sort_order).limit(limit)
+        query = {"guild_id": guild_id, "server_id": server_id}
+        if stat in self.LEADERBOARD_SORT_STATS:
+            # Matches the partial index filter so the planner can use it
+            query[stat] = {"$gt": 0}
+
+        cursor = self._pvp_data_stale.find(
+            query,
+            {"_id": 0, "player_name": 1, stat: 1, "kdr": 1, "current_streak": 1, "best_streak": 1}
+        )
+        if stat in self.LEADERBOARD_SORT_STATS:
+            cursor = cursor.hint(f"{stat}_leaderboard")
+        cursor = cursor.sort(stat, sort_order).limit(limit)
+
+        return await cursor.to_list(length=limit)
 
-        return await cursor.to_list(length=limit)
\ No newline at end of file
+    async def get_all_leaderboards(self, guild_id: int, server_id: Optional[str] = None,
+                                   limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the kills, kdr and longest_streak leaderboards in one aggregation
+
+        Without server_id, players are totalled across every server in the guild.
+        KDR only ranks players with at least 5 kills.
+        """
+        match = {"guild_id": guild_id}
+        if server_id is not None:
+            match["server_id"] = server_id
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": "$player_name",
+                "player_name": {"$first": "$player_name"},
+                "kills": {"$sum": "$kills"},
+                "deaths": {"$sum": "$deaths"},
+                "longest_streak": {"$max": "$longest_streak"}
+            }},
+            {"$project": {"_id": 0}},
+            {"$facet": {
+                "kills": [{"$sort": {"kills": -1}}, {"$limit": limit}],
+                "kdr": [
+                    {"$match": {"kills": {"$gte": 5}}},
+                    {"$addFields": {"kdr": {"$divide": ["$kills", {"$max": ["$deaths", 1]}]}}},
+                    {"$sort": {"kdr": -1}},
+                    {"$limit": limit}
+                ],
+                "longest_streak": [{"$sort": {"longest_streak": -1}}, {"$limit": limit}]
+            }}
+        ]
+
+        results = await (await self.pvp_data.aggregate(pipeline)).to_list(length=1)
+        return results[0] if results else {"kills": [], "kdr": [], "longest_streak": []}
\ No newline at end of file
@@ -30,6 +30,9 @@ class HistoricalParser:
     - Does not emit killfeed embeds
     """
 
+    # Parsed events written per bulk_apply_events call during a refresh
+    REPLAY_BATCH_SIZE = 500
+
     def __init__(self, bot):
         self.bot = bot
         self.killfeed_parser = KillfeedParser(bot)
@@ -296,12 +299,19 @@ class HistoricalParser:
                 "server_id": server_id
             })
 
-            # Clear kill events
+            # Clear kill events (after writing any still queued, so none land after the delete)
+            await self.bot.db_manager.flush_kill_events()
             await self.bot.db_manager.kill_events.delete_many({
                 "guild_id": guild_id,
                 "server_id": server_id
             })
 
+            # Clear kill event rollups (rebuilt as events are re-added)
+            await self.bot.db_manager.player_stats_rollup.delete_many({
+                "guild_id": guild_id,
+                "server_id": server_id
+            })
+
             logger.info(f"Cleared PvP data for server {server_id} in guild {guild_id}")
 
         except Exception as e:
@@ -435,6 +445,7 @@ class HistoricalParser:
             total_lines = len(lines)
             processed_count = 0
             last_update_time = datetime.now()
+            pending_events: List[Dict[str, Any]] = []
 
             # Process each line
             for i, line in enumerate(lines):
@@ -444,46 +455,18 @@ class HistoricalParser:
                 # Parse kill event (but don't send embeds)
                 kill_data = await self.killfeed_parser.parse_csv_line(line)
                 if kill_data:
-                    # Add to database without sending embeds
-                    await self.bot.db_manager.add_kill_event(guild_id, server_id, kill_data)
+                    # Queue for the next bulk write (no embeds are sent)
+                    pending_events.append(kill_data)
 
-                    # Update stats using proper MongoDB update syntax
                     # Skip entries with null/empty player names
                     if not kill_data['killer'] or not kill_data['victim']:
                         logger.warning(f"Skipping entry with null player name: {kill_data}")
-                        continue
-
-                    if not kill_data['is_suicide']:
-                        # Update killer stats atomically
-                        await self.bot.db_manager.pvp_data.update_one(
-                            {
-                                "guild_id": guild_id,
-                                "server_id": server_id,
-                                "player_name": kill_data['killer']
-                            },
-                            {
-                                "$inc": {"kills": 1},
-                                "$setOnInsert": {"deaths": 0, "suicides": 0}
-                            },
-                            upsert=True
-                        )
-
-                    # Update victim stats atomically
-                    update_field = "suicides" if kill_data['is_suicide'] else "deaths"
-                    await self.bot.db_manager.pvp_data.update_one(
-                        {
-                            "guild_id": guild_id,
-                            "server_id": server_id,
-                            "player_name": kill_data['victim']
-                        },
-                        {
-                            "$inc": {update_field: 1},
-                            "$setOnInsert": {"kills": 0}
-                        },
-                        upsert=True
-                    )
+                    else:
+                        processed_count += 1
 
-                    processed_count += 1
+                    if len(pending_events) >= self.REPLAY_BATCH_SIZE:
+                        await self.bot.db_manager.bulk_apply_events(guild_id, server_id, pending_events)
+                        pending_events = []
 
                 # Update progress embed every 30 seconds
                 current_time = datetime.now()
@@ -491,12 +474,19 @@ class HistoricalParser:
                     await self.update_progress_embed(channel, embed_message, i + 1, total_lines, server_id)
                     last_update_time = current_time
 
+            await self.bot.db_manager.bulk_apply_events(guild_id, server_id, pending_events)
+
             # Complete the refresh
             duration = (datetime.now() - start_time).total_seconds()
 
             if embed_message:
                 await self.complete_progress_embed(embed_message, server_id, processed_count, duration)
 
+            # Cached /stats results for this guild predate the rebuilt data
+            stats_cog = self.bot.get_cog('Stats')
+            if stats_cog:
+                stats_cog.invalidate_player_stats(guild_id)
+
             logger.info(f"Historical refresh completed for server {server_id}: {processed_count} events in {duration:.1f}s")
 
             self.active_refreshes[refresh_key] = False
@@ -795,15 +795,9 @@ class LogParser:
         try:
             logger.info("Running log parser for premium servers...")
 
-            # Get all guilds with configured servers
-            guilds_cursor = self.bot.database.guilds.find({})
-
-            async for guild_doc in guilds_cursor:
-                guild_id = guild_doc['guild_id']
-                servers = guild_doc.get('servers', [])
-
-                for server_config in servers:
-                    await self.parse_server_logs(guild_id, server_config)
+            # Get all configured servers across guilds
+            for server_config in await self.bot.db_manager.get_all_servers():
+                await self.parse_server_logs(server_config['guild_id'], server_config)
 
             logger.info("Log parser completed")
 
@@ -31,7 +31,7 @@ except ImportError as e:
     sys.exit(1)
 
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from bot.models.database import DatabaseManager
 from bot.parsers.killfeed_parser import KillfeedParser
@@ -523,7 +523,18 @@ class EmeraldKillfeedBot(commands.Bot):
             return False
             
         try:
-            self.mongo_client = AsyncIOMotorClient(mongo_uri)
+            # Pool sized for many guilds streaming kill events concurrently
+            pool_size = int(os.getenv('DB_POOL_SIZE', '200'))
+            self.mongo_client = AsyncMongoClient(
+                mongo_uri,
+                maxPoolSize=pool_size,
+                minPoolSize=min(20, pool_size),
+                waitQueueTimeoutMS=5000,
+                maxIdleTimeMS=60000,
+                # zlib ships with Python; zstd/snappy need extra packages that aren't dependencies
+                compressors="zlib",
+                zlibCompressionLevel=6
+            )
             self.database = self.mongo_client.emerald_killfeed
             
             # Initialize database manager with PHASE 1 architecture
@@ -535,6 +546,9 @@ class EmeraldKillfeedBot(commands.Bot):
             
             # Initialize database indexes
             await self.db_manager.initialize_indexes()
+            await self.db_manager.migrate_guild_servers()
+            await self.db_manager.migrate_players()
+            await self.db_manager.backfill_stats_rollup()
             logger.info("Database architecture initialized (PHASE 1)")
             
             # Initialize parsers (PHASE 2)
@@ -673,8 +687,12 @@ class EmeraldKillfeedBot(commands.Bot):
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
         
+        if hasattr(self, 'db_manager') and self.db_manager:
+            await self.db_manager.flush_wallet_events()
+            await self.db_manager.flush_kill_events()
+        
         if hasattr(self, 'mongo_client') and self.mongo_client:
-            self.mongo_client.close()
+            await self.mongo_client.close()
             logger.info("MongoDB connection closed")
         
         await super().close()